@@ -10,7 +10,13 @@ class Car:
         self.car_id = car_id
         self.destination = destination
 
-    def ask_node(self):
+    def ask_node(self, client=None):
+        if client is not None:
+            # Pooled, persistent connection (see node_client.NodeClient)
+            resp = client.next_edge(self.car_id, self.destination)
+            print(f"🚗 {self.car_id} → {resp}")
+            return resp
+
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s.connect((NODE_HOST, NODE_PORT))
 
@@ -20,14 +26,27 @@ class Car:
             "destination": self.destination
         }
 
-        s.send(json.dumps(req).encode())
-        resp = json.loads(s.recv(4096).decode())
+        # One JSON message per line
+        s.sendall(json.dumps(req).encode() + b"\n")
+        with s.makefile("rb") as f:
+            resp = json.loads(f.readline())
         s.close()
 
         print(f"🚗 {self.car_id} → {resp}")
+        return resp
+
+
+def ask_node_batch(cars, client):
+    """Route many cars with one NEXT_EDGE_BATCH round trip."""
+    results = client.next_edges([(car.car_id, car.destination) for car in cars])
+    for result in results:
+        print(f"🚗 {result['car_id']} → {result}")
+    return results
 
 
 if __name__ == "__main__":
+    from node_client import NodeClient
+
     cars = [
         Car("C1", "N5"),
         Car("C2", "N5"),
@@ -36,3 +55,7 @@ if __name__ == "__main__":
 
     for car in cars:
         car.ask_node()
+
+    client = NodeClient(NODE_HOST, NODE_PORT)
+    ask_node_batch(cars, client)
+    client.close()
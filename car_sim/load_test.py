@@ -0,0 +1,403 @@
+"""
+Node Load Test
+Simulates many concurrent cars against a NodeServer and reports throughput,
+latency percentiles, errors and server CPU as JSON
+
+    python car_sim/load_test.py                                # 1000 cars, closed loop
+    python car_sim/load_test.py --cars 5000 --rate 2000 --duration 30
+    python car_sim/load_test.py --dest N5=0.6,N8=0.3,!N99=0.1 --batch 32
+    python car_sim/load_test.py --node 127.0.0.1:9002          # existing server
+
+Unless --node is given, a NodeServer is started in a child process, backed
+by a local stub of the Django API serving a synthetic routing table.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+NODE_SIM_DIR = os.path.join(REPO_ROOT, "node_sim")
+
+NODE_ID = "N2"
+STUB_EDGES = ("E12", "E13", "E14", "E15")
+STUB_GREEN_S = 20
+
+READY_TIMEOUT_S = 15
+
+
+def raise_fd_limit():
+    """Thousands of cars need thousands of sockets. No-op without `resource` (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def free_port(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+# ---------- STUB API ----------
+def synthetic_routing_table(destinations, hops, seed=0):
+    """{destination: [{"next_hop", "prob"}, ...]} with `hops` random choices each."""
+    rng = random.Random(seed)
+    table = {}
+    for dest in destinations:
+        weights = [rng.random() + 0.05 for _ in range(hops)]
+        total = sum(weights)
+        table[dest] = [
+            {"next_hop": f"H{i}", "prob": round(w / total, 4)}
+            for i, w in enumerate(weights)
+        ]
+    return table
+
+
+def start_stub_api(host, routing_table):
+    """
+    Serve the endpoints NodeServer calls: routing table fetch, routing
+    watch (held, then 304) and green times. Returns (server, base_url).
+    """
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def _json(self, body, status=200):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path.endswith("/watch/"):
+                # Routing never changes during a run
+                time.sleep(5)
+                self.send_response(304)
+                self.end_headers()
+            elif path.startswith("/api/gettable/node/"):
+                self._json({"node_id": NODE_ID, "version": 1, "routing_table": routing_table})
+            else:
+                self._json({"error": "not found"}, status=404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            if self.path.startswith("/api/green/"):
+                self._json({"green_times": {e: STUB_GREEN_S for e in STUB_EDGES}})
+            else:
+                self._json({"error": "not found"}, status=404)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api"
+
+
+# ---------- NODE SERVER PROCESS ----------
+def serve_node(host, port, base_url):
+    """Child process entry point: a NodeServer pointed at the stub API."""
+    raise_fd_limit()
+    sys.path.insert(0, NODE_SIM_DIR)
+    # EDGE_IMAGES paths are relative to the repo root
+    os.chdir(REPO_ROOT)
+
+    import config
+    config.BASE_URL = base_url
+
+    from node_server import NodeServer
+    NodeServer(node_id=NODE_ID, host=host, port=port, base_url=base_url).start()
+
+
+def wait_until_listening(host, port, process=None, timeout=READY_TIMEOUT_S):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and not process.is_alive():
+            raise RuntimeError("Node server exited during startup")
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Node server not listening on {host}:{port} after {timeout}s")
+
+
+def cpu_seconds(pid):
+    """utime + stime of a process, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    # fields[0] is the state (3rd field of stat)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def peak_rss_mb(pid):
+    """Peak RSS of `pid`, or None where /proc is missing (non-Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+# ---------- LOAD ----------
+class Stats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.messages = 0
+        self.cars_routed = 0
+        self.errors = Counter()
+
+
+def parse_mix(text):
+    """"N5=0.7,N8=0.3" -> (destinations, weights)."""
+    destinations, weights = [], []
+    for part in text.split(","):
+        dest, _, weight = part.partition("=")
+        destinations.append(dest.strip())
+        weights.append(float(weight) if weight else 1.0)
+    return destinations, weights
+
+
+async def run_car(car_id, host, port, deadline, interval, batch, mix, stats):
+    """
+    One car on a persistent connection until `deadline`.
+
+    With an interval (open loop) latency is measured from the scheduled
+    send time, so a server that falls behind is charged for the queueing.
+    """
+    loop = asyncio.get_running_loop()
+    destinations, weights = mix
+
+    try:
+        reader, writer = await asyncio.open_connection(host, port, limit=1024 * 1024)
+    except OSError as e:
+        stats.errors[f"connect: {type(e).__name__}"] += 1
+        return
+
+    scheduled = loop.time() + random.random() * interval
+    try:
+        while True:
+            if interval:
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            start = scheduled if interval else loop.time()
+            if start >= deadline:
+                break
+            scheduled += interval
+
+            dests = random.choices(destinations, weights, k=batch)
+            if batch == 1:
+                req = {"type": "NEXT_EDGE", "car_id": car_id, "destination": dests[0]}
+            else:
+                req = {
+                    "type": "NEXT_EDGE_BATCH",
+                    "requests": [
+                        {"car_id": f"{car_id}.{i}", "destination": d}
+                        for i, d in enumerate(dests)
+                    ]
+                }
+
+            writer.write(json.dumps(req).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                stats.errors["disconnected"] += 1
+                break
+
+            stats.latencies_ms.append((loop.time() - start) * 1000)
+            stats.messages += 1
+
+            resp = json.loads(line)
+            results = resp.get("results", [resp])
+            for result in results:
+                if "error" in result:
+                    stats.errors[result["error"]] += 1
+                else:
+                    stats.cars_routed += 1
+    except (OSError, ValueError) as e:
+        stats.errors[type(e).__name__] += 1
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def generate_load(host, port, cars, duration, rate, batch, mix, ramp_s):
+    """
+    Args:
+        rate: total messages per second across all cars (0 = closed loop,
+              each car sends as soon as it gets its answer)
+        ramp_s: connections are opened evenly over this many seconds
+    """
+    loop = asyncio.get_running_loop()
+    stats = Stats()
+    interval = cars / rate if rate else 0.0
+
+    start = loop.time()
+    deadline = start + ramp_s + duration
+    tasks = []
+    for i in range(cars):
+        if ramp_s:
+            await asyncio.sleep(max(0.0, start + ramp_s * i / cars - loop.time()))
+        tasks.append(asyncio.create_task(
+            run_car(f"C{i}", host, port, deadline, interval, batch, mix, stats)
+        ))
+
+    await asyncio.gather(*tasks)
+    return stats, loop.time() - start
+
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return None
+    values = sorted(samples_ms)
+
+    def rank(p):
+        return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3)
+
+    return {
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': rank(50),
+        'p95_ms': rank(95),
+        'p99_ms': rank(99),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+def load_test(cars=1000, duration=10.0, rate=0.0, batch=1, mix="N5=0.7,N8=0.3",
+              hops=3, ramp_s=1.0, node=None, host="127.0.0.1"):
+    """
+    Run one load test.
+
+    Returns:
+        dict: JSON-serialisable report
+    """
+    raise_fd_limit()
+    destinations, weights = parse_mix(mix)
+
+    process = stub = None
+    if node:
+        host, port = node.rsplit(":", 1)
+        port = int(port)
+    else:
+        # Destinations prefixed "!" get no route (NO_ROUTE answers)
+        routed = [d for d in destinations if not d.startswith("!")]
+        stub, base_url = start_stub_api(host, synthetic_routing_table(routed, hops))
+        port = free_port(host)
+        process = multiprocessing.get_context("spawn").Process(
+            target=serve_node, args=(host, port, base_url), daemon=True
+        )
+        process.start()
+
+    try:
+        wait_until_listening(host, port, process)
+
+        cpu_start = cpu_seconds(process.pid) if process else None
+        stats, wall_s = asyncio.run(
+            generate_load(host, port, cars, duration, rate, batch,
+                          (destinations, weights), ramp_s)
+        )
+        cpu_end = cpu_seconds(process.pid) if process else None
+        server_rss = peak_rss_mb(process.pid) if process else None
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join(5)
+        if stub is not None:
+            stub.shutdown()
+
+    server_cpu = None
+    if cpu_start is not None and cpu_end is not None:
+        server_cpu = {
+            'cpu_s': round(cpu_end - cpu_start, 3),
+            'cpu_percent': round(100 * (cpu_end - cpu_start) / wall_s, 1),
+        }
+        if server_rss is not None:
+            server_cpu['peak_rss_mb'] = server_rss
+
+    return {
+        'node': f"{host}:{port}",
+        'cars': cars,
+        'duration_s': duration,
+        'ramp_s': ramp_s,
+        'target_rate_msg_s': rate or None,
+        'batch': batch,
+        'destination_mix': dict(zip(destinations, weights)),
+        'wall_time_s': round(wall_s, 3),
+        'messages': stats.messages,
+        'cars_routed': stats.cars_routed,
+        'throughput_msg_s': round(stats.messages / wall_s, 1) if wall_s else None,
+        'throughput_cars_s': round(stats.cars_routed / wall_s, 1) if wall_s else None,
+        'latency': percentiles(stats.latencies_ms),
+        'errors': dict(stats.errors),
+        'server': server_cpu,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=1000, help='concurrent car connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load after ramp-up')
+    parser.add_argument('--rate', type=float, default=0.0, help='total messages/s (0 = closed loop)')
+    parser.add_argument('--batch', type=int, default=1, help='cars per message (>1 uses NEXT_EDGE_BATCH)')
+    parser.add_argument('--dest', default='N5=0.7,N8=0.3',
+                        help='destination mix; prefix a destination with ! to leave it unrouted')
+    parser.add_argument('--hops', type=int, default=3, help='next-hop choices per routed destination')
+    parser.add_argument('--ramp', type=float, default=1.0, help='seconds to open all connections')
+    parser.add_argument('--node', default=None, help='HOST:PORT of a running node (skips stub + spawn)')
+    parser.add_argument('--output', default=None, help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    report = load_test(
+        cars=args.cars,
+        duration=args.duration,
+        rate=args.rate,
+        batch=max(1, args.batch),
+        mix=args.dest,
+        hops=args.hops,
+        ramp_s=args.ramp,
+        node=args.node,
+    )
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
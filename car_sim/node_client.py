@@ -0,0 +1,114 @@
+import json
+import queue
+import socket
+
+NODE_HOST = "127.0.0.1"
+NODE_PORT = 9002
+
+# Cars per NEXT_EDGE_BATCH message (keeps lines well under the node's
+# 64 KiB message limit)
+MAX_BATCH = 256
+
+
+class NodeConnection:
+    """One persistent, newline-framed connection to a node server."""
+
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, req):
+        self.sock.sendall(json.dumps(req).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Node closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.reader.close()
+        finally:
+            self.sock.close()
+
+
+class NodeClient:
+    """
+    Pool of persistent connections to one node server, safe to share
+    between threads. Gateways use next_edges() to route many cars in a
+    single NEXT_EDGE_BATCH round trip.
+    """
+
+    def __init__(self, host=NODE_HOST, port=NODE_PORT, pool_size=4, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return NodeConnection(self.host, self.port, self.timeout)
+
+    def _release(self, conn):
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def request(self, req):
+        """
+        Send one message and return the decoded response. A pooled
+        connection the node has since closed is replaced and the
+        request retried once.
+        """
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                resp = conn.request(req)
+            except (OSError, ValueError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            self._release(conn)
+            return resp
+
+    def next_edge(self, car_id, destination):
+        return self.request({
+            "type": "NEXT_EDGE",
+            "car_id": car_id,
+            "destination": destination
+        })
+
+    def next_edges(self, cars):
+        """
+        Args:
+            cars: [(car_id, destination), ...]
+
+        Returns:
+            [{"car_id": C, "next_edge": E} or {"car_id": C, "error": ...}, ...]
+            in the same order
+        """
+        results = []
+        for start in range(0, len(cars), MAX_BATCH):
+            resp = self.request({
+                "type": "NEXT_EDGE_BATCH",
+                "requests": [
+                    {"car_id": car_id, "destination": destination}
+                    for car_id, destination in cars[start:start + MAX_BATCH]
+                ]
+            })
+            if "results" not in resp:
+                raise RuntimeError(f"Node rejected batch: {resp.get('error')}")
+            results.extend(resp["results"])
+        return results
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
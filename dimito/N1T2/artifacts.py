@@ -0,0 +1,135 @@
+"""
+Artifact Writer
+Persists result JSON and annotated images off the request path
+"""
+
+import json
+import os
+import queue
+import threading
+
+import cv2
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Where output_json/ and output_images/ are created
+ARTIFACT_DIR = os.environ.get("DIMITO_ARTIFACT_DIR", os.path.join(CURRENT_DIR, "STUB", "output"))
+
+# Keep every Nth frame per camera (1 = every frame)
+SAMPLE_EVERY = int(os.environ.get("DIMITO_ARTIFACT_SAMPLE_EVERY", "1"))
+
+# Pending writes allowed before new artifacts are dropped
+QUEUE_SIZE = int(os.environ.get("DIMITO_ARTIFACT_QUEUE_SIZE", "64"))
+
+WORKERS = 1
+
+
+class FrameSampler:
+    """
+    Picks every Nth frame of each camera for saving.
+
+    Counts are per process: with an inference pool the web process decides
+    and passes the verdict to the workers, so the rate does not depend on
+    which worker gets a frame.
+    """
+
+    def __init__(self, sample_every=SAMPLE_EVERY):
+        self.sample_every = max(1, int(sample_every))
+        self._frame_counts = {}
+        self._lock = threading.Lock()
+
+    def should_sample(self, camera_id):
+        """True for every `sample_every`-th frame of a camera."""
+        with self._lock:
+            count = self._frame_counts.get(camera_id, 0)
+            self._frame_counts[camera_id] = count + 1
+        return count % self.sample_every == 0
+
+
+class ArtifactWriter:
+    """
+    Bounded background writer for debug artifacts.
+
+    When the queue is full new artifacts are dropped rather than slowing
+    the caller down.
+    """
+
+    def __init__(self, output_dir=ARTIFACT_DIR, queue_size=QUEUE_SIZE, workers=WORKERS):
+        self.output_dir = output_dir
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        self.written = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(output_dir, "output_json"), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, "output_images"), exist_ok=True)
+
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True)
+            for _ in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, base_name, json_data, image=None):
+        """
+        Queue one frame's artifacts. Returns False if it was dropped.
+        """
+        try:
+            self.queue.put_nowait((base_name, json_data, image))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def flush(self):
+        """Block until everything queued so far is on disk."""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            base_name, json_data, image = self.queue.get()
+            try:
+                self.write(base_name, json_data, image)
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                print(f"⚠️  Could not write artifacts for {base_name}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write(self, base_name, json_data, image=None):
+        """Write one frame's artifacts synchronously."""
+        # Save JSON
+        json_path = os.path.join(self.output_dir, "output_json", f"{base_name}.json")
+        with open(json_path, "w") as f:
+            json.dump(json_data, f, indent=4)
+
+        # Save image if provided
+        if image is not None:
+            image_path = os.path.join(self.output_dir, "output_images", f"{base_name}.jpg")
+            cv2.imwrite(image_path, image)
+
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+_SAMPLER = FrameSampler()
+
+
+def get_sampler():
+    """Process-wide FrameSampler."""
+    return _SAMPLER
+
+
+def get_writer():
+    """Process-wide ArtifactWriter, started on first use."""
+    global _WRITER
+    if _WRITER is None:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                _WRITER = ArtifactWriter()
+    return _WRITER
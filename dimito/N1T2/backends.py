@@ -0,0 +1,224 @@
+"""
+Detector Backends
+Run the vehicle detector through ultralytics (.pt) or ONNX Runtime (.onnx)
+"""
+
+import ast
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+# xyxy: N x 4 boxes in input-image pixels, conf: N scores, cls: N class ids,
+# plot: zero-arg callable returning the input image with boxes drawn
+Detections = namedtuple("Detections", ["xyxy", "conf", "cls", "plot"])
+
+
+class UltralyticsBackend:
+    """Eager PyTorch inference through ultralytics.YOLO."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+
+    def detect(self, images, conf=0.5, imgsz=640):
+        results = self.model.predict(source=images, conf=conf, imgsz=imgsz, verbose=False)
+        return [self._to_detections(result) for result in results]
+
+    def _to_detections(self, result):
+        boxes = result.boxes
+        # One device -> host transfer per field
+        return Detections(
+            xyxy=boxes.xyxy.cpu().numpy(),
+            conf=boxes.conf.cpu().numpy(),
+            cls=boxes.cls.cpu().numpy().astype(np.intp),
+            plot=lambda: result.plot(line_width=2),
+        )
+
+
+class OnnxBackend:
+    """
+    CPU inference of the exported YOLOv8 .onnx model through ONNX Runtime.
+
+    Pre/post-processing mirrors ultralytics' predictor: the same letterbox
+    (minimal stride-aligned padding when the export has dynamic H/W, the
+    fixed export size otherwise), strict `score > conf` filter and
+    class-aware NMS. Remaining differences come from the runtimes'
+    float arithmetic and the NMS implementation; boxes agree to within a
+    pixel or so and counts almost always match. Check a model pair with
+    `python -m N1T2.parity`.
+    """
+
+    name = "onnx"
+
+    IOU_THRESHOLD = 0.7   # ultralytics predict default
+    MAX_DETECTIONS = 300
+    PAD_VALUE = 114
+    DEFAULT_STRIDE = 32
+
+    def __init__(self, model_path, threads=0, quantize=False):
+        """
+        Args:
+            model_path (str): Path to the exported .onnx model
+            threads (int): intra-op threads (0 = ONNX Runtime default)
+            quantize (bool): Run an int8 dynamically quantised copy of the model
+        """
+        import onnxruntime as ort
+
+        if quantize:
+            model_path = quantize_model(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports take exactly one image per run
+        self.fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        # Static exports also fix H x W; dynamic ones accept ultralytics'
+        # rectangular (stride-aligned) letterbox
+        height, width = model_input.shape[2:4]
+        self.fixed_size = (height, width) if isinstance(height, int) and isinstance(width, int) else None
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+        self.stride = int(ast.literal_eval(metadata["stride"])) if "stride" in metadata else self.DEFAULT_STRIDE
+
+    def detect(self, images, conf=0.5, imgsz=640):
+        if self.fixed_size is not None:
+            target, auto = self.fixed_size, False
+        else:
+            # Like ultralytics: minimal padding only when the whole batch
+            # shares one shape (so the blobs can be stacked)
+            target = (imgsz, imgsz)
+            auto = len({image.shape for image in images}) == 1
+        prepared = [self._letterbox(image, target, auto) for image in images]
+
+        outputs = []
+        step = self.fixed_batch or len(prepared)
+        for start in range(0, len(prepared), step):
+            blob = np.stack([p[0] for p in prepared[start:start + step]])
+            outputs.extend(self.session.run(None, {self.input_name: blob})[0])
+
+        return [
+            self._postprocess(output, image, ratio, pad, conf)
+            for output, image, (_, ratio, pad) in zip(outputs, images, prepared)
+        ]
+
+    def _letterbox(self, image, target, auto):
+        """
+        ultralytics LetterBox: resize keeping aspect ratio, then pad to
+        target (H, W), or with `auto` only up to the next stride multiple.
+        Returns the NCHW float32 blob, the ratio and the (left, top) pad.
+        """
+        height, width = image.shape[:2]
+        ratio = min(target[0] / height, target[1] / width)
+        new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+
+        if (new_w, new_h) != (width, height):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        dw, dh = target[1] - new_w, target[0] - new_h
+        if auto:
+            dw, dh = dw % self.stride, dh % self.stride
+        pad_x, pad_y = dw / 2, dh / 2
+        top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+        left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+        image = cv2.copyMakeBorder(
+            image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+            value=(self.PAD_VALUE,) * 3
+        )
+
+        blob = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+        return blob, ratio, (left, top)
+
+    def _postprocess(self, output, image, ratio, pad, conf):
+        # (4 + nc, anchors) -> (anchors, 4 + nc)
+        predictions = output.T
+        class_scores = predictions[:, 4:]
+        cls = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(cls)), cls]
+
+        keep = scores > conf
+        boxes, scores, cls = predictions[keep, :4], scores[keep], cls[keep]
+
+        # cx, cy, w, h -> x1, y1, x2, y2 in original image pixels
+        xyxy = np.empty_like(boxes)
+        xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+        xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+        xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=xyxy.dtype)
+        xyxy /= ratio
+
+        height, width = image.shape[:2]
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+
+        if len(scores):
+            # Class-aware NMS: shift each class into its own coordinate range
+            offset = cls[:, None].astype(xyxy.dtype) * max(width, height)
+            shifted = xyxy + offset
+            rects = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+            kept = cv2.dnn.NMSBoxes(rects.tolist(), scores.tolist(), conf, self.IOU_THRESHOLD)
+            kept = np.array(kept, dtype=np.intp).reshape(-1)[:self.MAX_DETECTIONS]
+            xyxy, scores, cls = xyxy[kept], scores[kept], cls[kept]
+
+        cls = cls.astype(np.intp)
+        return Detections(
+            xyxy=xyxy,
+            conf=scores,
+            cls=cls,
+            plot=lambda: draw_detections(image, xyxy, scores, cls, self.names),
+        )
+
+
+def draw_detections(image, xyxy, conf, cls, names):
+    """Annotated copy of `image` in the spirit of ultralytics' Results.plot."""
+    annotated = image.copy()
+    for (x1, y1, x2, y2), score, class_id in zip(xyxy.astype(int), conf, cls):
+        label = f"{names.get(int(class_id), int(class_id))} {score:.2f}"
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), (255, 56, 56), 2)
+        cv2.putText(annotated, label, (x1, max(y1 - 5, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return annotated
+
+
+def quantize_model(model_path):
+    """
+    int8 dynamic quantisation of an .onnx model, cached next to it as
+    <name>.int8.onnx and rebuilt when the source model is newer.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = os.path.splitext(model_path)[0] + ".int8.onnx"
+    if (not os.path.exists(quantized_path)
+            or os.path.getmtime(quantized_path) < os.path.getmtime(model_path)):
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QUInt8)
+        print(f"🗜️  Quantised model written: {quantized_path}")
+    return quantized_path
+
+
+def load_backend(model_path, backend=None, **options):
+    """
+    Build a detector backend. `backend` defaults from the file extension
+    ('.onnx' -> ONNX Runtime, anything else -> ultralytics).
+    """
+    if backend is None:
+        backend = "onnx" if model_path.lower().endswith(".onnx") else "ultralytics"
+
+    if backend == "onnx":
+        return OnnxBackend(model_path, **options)
+    if backend == "ultralytics":
+        return UltralyticsBackend(model_path)
+    raise ValueError(f"Unknown backend: {backend}")
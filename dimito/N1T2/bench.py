@@ -0,0 +1,208 @@
+"""
+Inference Benchmark
+Replays frames through TrafficAnalyzer and reports per-stage timings as JSON
+
+    python -m N1T2.bench                                  # bundled valid/ images
+    python -m N1T2.bench --synthetic 200 --batch 4
+    python -m N1T2.bench --model runs/detect/train/weights/best.onnx --quantize
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .artifacts import ArtifactWriter
+from .infer import TrafficAnalyzer
+from .model_registry import DEFAULT_MODEL_PATH
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_IMAGE_DIR = os.path.join(CURRENT_DIR, 'Vehicle_Detection_Image_Dataset', 'valid', 'images')
+
+STAGES = TrafficAnalyzer.STAGES + ('artifacts',)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_frames(image_dir, limit=None):
+    """Encoded bytes of every image in `image_dir` (decode is timed later)."""
+    names = sorted(
+        n for n in os.listdir(image_dir)
+        if n.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+    frames = []
+    for name in names:
+        with open(os.path.join(image_dir, name), 'rb') as f:
+            frames.append((os.path.splitext(name)[0], f.read()))
+    return frames
+
+
+def synthetic_frames(count, size=640, seed=0):
+    """Random noise JPEGs, for machines without the dataset checked out."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        image = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode('.jpg', image)
+        frames.append((f"synthetic_{i}", encoded.tobytes()))
+    return frames
+
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return None
+    values = np.array(samples_ms)
+    return {
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def peak_rss_mb():
+    """Peak RSS of this process, or None where `resource` is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_batch(analyzer, writer, batch, camera_id, save_visual, timings):
+    """
+    One batch through TrafficAnalyzer.predict_batch, timed per stage via
+    its on_stage callback, plus a synchronous artifact write. Times are
+    per batch, split evenly across its frames.
+    """
+    n = len(batch)
+    batch_stages = {}
+
+    def record(stage, seconds):
+        batch_stages[stage] = seconds
+
+    outputs = analyzer.predict_batch(
+        [(data, camera_id) for _, data in batch],
+        save_visual=save_visual,
+        on_stage=record
+    )
+
+    start = time.perf_counter()
+    for (name, _), output in zip(batch, outputs):
+        writer.write(name, output['json'], output['img'])
+    batch_stages['artifacts'] = time.perf_counter() - start
+
+    for stage in STAGES:
+        timings[stage].extend([batch_stages[stage] * 1000 / n] * n)
+    timings['total'].extend([sum(batch_stages.values()) * 1000 / n] * n)
+
+
+def benchmark(frames, model_path, camera_id='CC_01', batch_size=1, warmup=3,
+              repeat=1, save_visual=False, crop_to_roi=False, backend_options=None):
+    """
+    Replay `frames` ((name, encoded bytes) pairs) through the pipeline.
+
+    Returns:
+        dict: JSON-serialisable report
+    """
+    load_start = time.perf_counter()
+    analyzer = TrafficAnalyzer(model_path, output_dir=None, crop_to_roi=crop_to_roi,
+                               **(backend_options or {}))
+    load_ms = (time.perf_counter() - load_start) * 1000
+
+    batches = [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)]
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Artifacts are written synchronously here so their cost is measured
+        writer = ArtifactWriter(output_dir=out_dir, workers=0)
+
+        warm = {stage: [] for stage in STAGES + ('total',)}
+        for batch in batches[:warmup]:
+            run_batch(analyzer, writer, batch, camera_id, save_visual, warm)
+
+        timings = {stage: [] for stage in STAGES + ('total',)}
+        wall_start = time.perf_counter()
+        for _ in range(repeat):
+            for batch in batches:
+                run_batch(analyzer, writer, batch, camera_id, save_visual, timings)
+        wall_s = time.perf_counter() - wall_start
+
+    processed = len(timings['total'])
+    return {
+        'model': os.path.basename(model_path),
+        'backend': analyzer.backend.name,
+        'backend_options': backend_options or {},
+        'camera_id': camera_id,
+        'frames': processed,
+        'batch_size': batch_size,
+        'save_visual': save_visual,
+        'crop_to_roi': crop_to_roi,
+        'model_load_ms': round(load_ms, 1),
+        'wall_time_s': round(wall_s, 3),
+        'throughput_fps': round(processed / wall_s, 2) if wall_s else None,
+        'stages': {stage: percentiles(samples) for stage, samples in timings.items()},
+        'peak_rss_mb': peak_rss_mb(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default=DEFAULT_IMAGE_DIR, help='directory of frames to replay')
+    parser.add_argument('--synthetic', type=int, default=0, help='use N random frames instead of --images')
+    parser.add_argument('--limit', type=int, default=None, help='max frames to load from --images')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='.pt or .onnx model')
+    parser.add_argument('--camera', default='CC_01', help='camera whose ROI is applied')
+    parser.add_argument('--batch', type=int, default=1, help='frames per forward pass')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed warm-up batches')
+    parser.add_argument('--repeat', type=int, default=1, help='passes over the frame set')
+    parser.add_argument('--visual', action='store_true', help='render annotated images')
+    parser.add_argument('--crop', action='store_true', help='crop to the ROI bounding box')
+    parser.add_argument('--threads', type=int, default=0, help='ONNX Runtime intra-op threads')
+    parser.add_argument('--quantize', action='store_true', help='int8 dynamic quantisation (ONNX)')
+    parser.add_argument('--output', default=None, help='write the JSON report here')
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        frames = synthetic_frames(args.synthetic)
+    else:
+        frames = load_frames(args.images, args.limit)
+    if not frames:
+        parser.error(f"No frames found in {args.images}")
+
+    backend_options = {}
+    if args.model.lower().endswith('.onnx'):
+        backend_options = {'threads': args.threads, 'quantize': args.quantize}
+
+    report = benchmark(
+        frames, args.model,
+        camera_id=args.camera,
+        batch_size=args.batch,
+        warmup=args.warmup,
+        repeat=args.repeat,
+        save_visual=args.visual,
+        crop_to_roi=args.crop,
+        backend_options=backend_options,
+    )
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,24 @@ Traffic Analysis Inference Module
 Handles vehicle detection, counting, and traffic metric calculations
 """
 
+import time
+
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from .roi_finder import select_road_roi
+from .backends import load_backend
+from .roi_cache import get_roi
+
+
+def decode_image(data):
+    """
+    Decode an encoded image (JPEG/PNG bytes, bytearray or memoryview)
+    straight from memory into a BGR ndarray.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Could not decode image buffer")
+    return image
 
 
 class TrafficAnalyzer:
@@ -19,6 +33,9 @@ class TrafficAnalyzer:
         'truck': [5, 7]       # bus, truck
     }
     
+    # Category order used by the vectorised counter (index 3 = unmapped class)
+    CATEGORIES = ('car', 'bike', 'truck')
+    
     # Average vehicle dimensions (length × width in meters)
     VEHICLE_DIMENSIONS = {
         'car': {'length': 4.5, 'width': 1.8, 'area': 8.1},
@@ -30,69 +47,136 @@ class TrafficAnalyzer:
     ALPHA = 0.6  # Queue length weight
     BETA = 0.4   # Density weight
     
-    def __init__(self, model_path, output_dir):
+    # Stages reported to predict_batch's on_stage callback, in order
+    STAGES = ('decode', 'masking', 'inference', 'postprocess')
+    
+    def __init__(self, model_path, output_dir, crop_to_roi=False, backend=None, **backend_options):
         """
         Args:
-            model_path (str): Path to YOLOv8 model weights
+            model_path (str): Path to YOLOv8 model weights (.pt) or exported .onnx
             output_dir (str): Base directory for outputs (handled by caller)
+            crop_to_roi (bool): Crop frames to the ROI bounding box before
+                                inference so YOLO sees fewer pixels
+            backend (str): 'ultralytics' or 'onnx' (default: from file extension)
+            **backend_options: e.g. threads / quantize for the ONNX backend
         """
-        self.model = YOLO(model_path)
+        self.backend = load_backend(model_path, backend, **backend_options)
         self.output_dir = output_dir
+        self.crop_to_roi = crop_to_roi
+        
+        # class_id -> category index lookup table for np.bincount
+        max_class_id = max(c for ids in self.CLASS_MAPPING.values() for c in ids)
+        self._class_lut = np.full(max_class_id + 1, len(self.CATEGORIES), dtype=np.intp)
+        for index, category in enumerate(self.CATEGORIES):
+            self._class_lut[self.CLASS_MAPPING[category]] = index
     
     def predict(self, image_path, camera_id, save_visual=True):
         """
         Analyze traffic image and calculate metrics
         
         Args:
-            image_path (str): Path to input image
+            image_path (str | np.ndarray): Path to input image, or an
+                                           already decoded BGR frame
             camera_id (str): Camera identifier
             save_visual (bool): Whether to generate annotated image
         
         Returns:
             dict: Contains 'json' (metrics) and 'img' (annotated image or None)
         """
-        # Load image
+        return self.predict_batch([(image_path, camera_id)], save_visual=save_visual)[0]
+    
+    def predict_batch(self, items, save_visual=True, on_stage=None):
+        """
+        Analyze several traffic images with a single YOLO forward pass
+        
+        Args:
+            items (list): (image path, encoded bytes or BGR ndarray, camera_id)
+                          pairs, e.g. one per approach of an intersection
+            save_visual (bool | list): Whether to generate annotated images,
+                                       either for all items or per item
+            on_stage (callable): Optional on_stage(stage, seconds), called
+                                 once per entry of STAGES for the whole batch
+        
+        Returns:
+            list: One dict per item, same shape as predict()
+        """
+        if not items:
+            return []
+        
+        if isinstance(save_visual, bool):
+            save_visual = [save_visual] * len(items)
+        
+        t0 = time.perf_counter()
+        images = [self._load_image(image_path) for image_path, _ in items]
+        t1 = time.perf_counter()
+        frames = [
+            self._apply_roi(image, camera_id)
+            for image, (_, camera_id) in zip(images, items)
+        ]
+        t2 = time.perf_counter()
+        
+        # Run YOLO detection on the whole batch
+        detections = self.backend.detect(
+            [masked_image for masked_image, _, _ in frames],
+            conf=0.5, imgsz=640
+        )
+        t3 = time.perf_counter()
+        
+        outputs = [
+            self._build_output(detection, image, roi, offset, visual)
+            for detection, image, (_, roi, offset), visual
+            in zip(detections, images, frames, save_visual)
+        ]
+        t4 = time.perf_counter()
+        
+        if on_stage is not None:
+            for stage, seconds in zip(self.STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                on_stage(stage, seconds)
+        
+        return outputs
+    
+    def _load_image(self, image_path):
+        if isinstance(image_path, np.ndarray):
+            return image_path
+        if isinstance(image_path, (bytes, bytearray, memoryview)):
+            return decode_image(image_path)
         image = cv2.imread(image_path)
         if image is None:
             raise ValueError(f"Could not read image: {image_path}")
+        return image
+    
+    def _apply_roi(self, image, camera_id):
+        """
+        Mask image to the camera's road polygon.
         
-        # Get ROI data for this camera
-        roi_data = select_road_roi(camera_id)
-        roi_polygon = np.array(roi_data['polygon'], dtype=np.int32)
-        road_length_m = roi_data['real_length_m']
-        road_width_m = roi_data['real_width_m']
-        total_road_area_m2 = road_length_m * road_width_m
+        Returns:
+            tuple: (masked_image, roi, offset) where offset is the (x, y) of
+                   masked_image inside the full frame (non-zero when cropped)
+        """
+        # Cached polygon, mask and bounding box for this camera
+        roi = get_roi(camera_id, image.shape)
         
         # Apply polygon mask to image
-        mask = np.zeros(image.shape[:2], dtype=np.uint8)
-        cv2.fillPoly(mask, [roi_polygon.astype(np.int32)], 255)
-        masked_image = cv2.bitwise_and(image, image, mask=mask)
+        if self.crop_to_roi:
+            x0, y0, x1, y1 = roi['bbox']
+            crop = image[y0:y1, x0:x1]
+            masked_image = cv2.bitwise_and(crop, crop, mask=roi['bbox_mask'])
+            return masked_image, roi, (x0, y0)
         
-        # Run YOLO detection
-        results = self.model.predict(source=masked_image, conf=0.5, imgsz=640, verbose=False)
-        result = results[0]
+        masked_image = cv2.bitwise_and(image, image, mask=roi['mask'])
+        return masked_image, roi, (0, 0)
+    
+    def _build_output(self, detections, image, roi, offset, save_visual):
+        roi_polygon = roi['polygon']
+        road_length_m = roi['road_length_m']
+        road_width_m = roi['road_width_m']
+        total_road_area_m2 = road_length_m * road_width_m
+        x_offset, y_offset = offset
         
         # Count vehicles by type (only if center is inside polygon)
-        vehicle_counts = {'car': 0, 'bike': 0, 'truck': 0, 'total': 0}
-        
-        for box in result.boxes:
-            x_center, y_center = box.xywh[0][:2].cpu().numpy()
-            
-            # Check if center point is inside polygon
-            if cv2.pointPolygonTest(roi_polygon, (float(x_center), float(y_center)), False) >= 0:
-                class_id = int(box.cls[0].item())
-                
-                if class_id in self.CLASS_MAPPING['car']:
-                    vehicle_counts['car'] += 1
-                elif class_id in self.CLASS_MAPPING['bike']:
-                    vehicle_counts['bike'] += 1
-                elif class_id in self.CLASS_MAPPING['truck']:
-                    vehicle_counts['truck'] += 1
-                
-                vehicle_counts['total'] += 1
+        centers = (detections.xyxy[:, :2] + detections.xyxy[:, 2:]) / 2
+        vehicle_counts = self._count_vehicles(centers + (x_offset, y_offset), detections.cls, roi['mask'])
         
-
-
         # Calculate total occupied area
         # total_vehicle_area_m2 = (
         #     vehicle_counts['car'] * self.VEHICLE_DIMENSIONS['car']['area'] +
@@ -130,7 +214,14 @@ class TrafficAnalyzer:
         # Generate annotated image if requested
         annotated_image = None
         if save_visual:
-            annotated_image = result.plot(line_width=2)
+            plotted = detections.plot()
+            if offset == (0, 0):
+                annotated_image = plotted
+            else:
+                # Paste the annotated crop back into the full frame
+                annotated_image = image.copy()
+                h, w = plotted.shape[:2]
+                annotated_image[y_offset:y_offset + h, x_offset:x_offset + w] = plotted
             cv2.polylines(annotated_image, [roi_polygon], isClosed=True, 
                          color=(0, 255, 0), thickness=3)
         
@@ -146,4 +237,39 @@ class TrafficAnalyzer:
         return {
             "json": json_output,
             "img": annotated_image
-        }
\ No newline at end of file
+        }
+    
+    def _count_vehicles(self, centers, class_ids, mask):
+        """
+        Count detections whose centre falls on the ROI mask, per category.
+        
+        Args:
+            centers (np.ndarray): N x 2 box centres in full-frame coordinates
+            class_ids (np.ndarray): N class ids
+            mask (np.ndarray): full-frame uint8 ROI mask
+        
+        Returns:
+            dict: {'car', 'bike', 'truck', 'total'} counts
+        """
+        height, width = mask.shape
+        xs = centers[:, 0].astype(np.intp)
+        ys = centers[:, 1].astype(np.intp)
+        
+        # Point-in-polygon via the rasterised mask
+        in_frame = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        inside = np.zeros(len(class_ids), dtype=bool)
+        inside[in_frame] = mask[ys[in_frame], xs[in_frame]] > 0
+        
+        # Ids outside the lookup table count as unmapped
+        ids = class_ids[inside]
+        known = ids < len(self._class_lut)
+        categories = np.full(len(ids), len(self.CATEGORIES), dtype=np.intp)
+        categories[known] = self._class_lut[ids[known]]
+        per_category = np.bincount(categories, minlength=len(self.CATEGORIES) + 1)
+        
+        vehicle_counts = {
+            category: int(per_category[index])
+            for index, category in enumerate(self.CATEGORIES)
+        }
+        vehicle_counts['total'] = int(inside.sum())
+        return vehicle_counts
@@ -0,0 +1,91 @@
+"""
+Model Registry
+Loads each weights file once per worker process and hands out shared analyzers
+"""
+
+import os
+import threading
+
+from .infer import TrafficAnalyzer
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+WEIGHTS_DIR = os.path.join(CURRENT_DIR, 'runs', 'detect', 'train', 'weights')
+
+# 'ultralytics' runs best.pt through torch, 'onnx' runs best.onnx (exported
+# by train.run_training) through ONNX Runtime on CPU
+BACKEND = os.environ.get("DIMITO_ML_BACKEND", "ultralytics")
+ONNX_THREADS = int(os.environ.get("DIMITO_ONNX_THREADS", "0"))
+ONNX_QUANTIZE = os.environ.get("DIMITO_ONNX_QUANTIZE", "0") == "1"
+
+DEFAULT_MODEL_PATH = os.path.join(WEIGHTS_DIR, 'best.onnx' if BACKEND == 'onnx' else 'best.pt')
+
+# model_path -> {"analyzer": TrafficAnalyzer, "mtime": float}
+_REGISTRY = {}
+_LOCK = threading.Lock()
+
+
+def _weights_mtime(model_path):
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found: {model_path}")
+    return os.path.getmtime(model_path)
+
+
+def get_analyzer(model_path=DEFAULT_MODEL_PATH):
+    """
+    Return the process-wide TrafficAnalyzer for `model_path`.
+
+    Weights are loaded on first use only. If the file on disk has been
+    replaced since it was loaded (e.g. a new best.pt was copied in), the
+    model is reloaded transparently on the next call.
+
+    Args:
+        model_path (str): Path to YOLOv8 model weights (.pt or .onnx)
+
+    Returns:
+        TrafficAnalyzer: shared analyzer instance
+    """
+    model_path = os.path.abspath(model_path)
+    mtime = _weights_mtime(model_path)
+
+    entry = _REGISTRY.get(model_path)
+    if entry is not None and entry["mtime"] == mtime:
+        return entry["analyzer"]
+
+    with _LOCK:
+        # Another thread may have loaded it while we waited
+        entry = _REGISTRY.get(model_path)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry["analyzer"]
+
+        options = {}
+        if model_path.lower().endswith(".onnx"):
+            options = {"threads": ONNX_THREADS, "quantize": ONNX_QUANTIZE}
+        analyzer = TrafficAnalyzer(model_path, output_dir=None, **options)
+        _REGISTRY[model_path] = {"analyzer": analyzer, "mtime": mtime}
+        print(f"🧠 Model loaded: {model_path}")
+        return analyzer
+
+
+def reload_model(model_path=DEFAULT_MODEL_PATH):
+    """
+    Force a reload of `model_path`, e.g. after swapping in new weights
+    with the same modification time. Requests already holding the old
+    analyzer finish on it; new requests get the new one.
+    """
+    model_path = os.path.abspath(model_path)
+    with _LOCK:
+        _REGISTRY.pop(model_path, None)
+    return get_analyzer(model_path)
+
+
+def warm_up(model_path=DEFAULT_MODEL_PATH):
+    """
+    Load the model ahead of the first request (called at Django startup).
+    """
+    return get_analyzer(model_path)
+
+
+def loaded_models():
+    """Paths of the models currently held by this process."""
+    return list(_REGISTRY.keys())
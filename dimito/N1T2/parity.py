@@ -0,0 +1,134 @@
+"""
+Backend Parity Check
+Runs the same frames through two detector backends (e.g. best.pt and its
+best.onnx export) and reports how far their detections differ
+
+    python -m N1T2.parity --reference runs/detect/train/weights/best.pt \
+                          --candidate runs/detect/train/weights/best.onnx
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from .backends import load_backend
+from .bench import DEFAULT_IMAGE_DIR, load_frames
+from .infer import decode_image
+
+
+# A detection counts as reproduced when a same-class box overlaps it this much
+MATCH_IOU = 0.9
+
+# Tolerances for a passing pair
+MIN_MATCHED_FRACTION = 0.97
+MAX_COUNT_MISMATCH_FRACTION = 0.05
+
+
+def box_iou(a, b):
+    """IoU matrix between N x 4 and M x 4 xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_detections(ref, cand):
+    """
+    Greedy same-class matching of two Detections, best IoU first.
+
+    Returns:
+        list of (iou, |conf difference|) for matched pairs
+    """
+    if not len(ref.conf) or not len(cand.conf):
+        return []
+
+    iou = box_iou(ref.xyxy, cand.xyxy)
+    iou[ref.cls[:, None] != cand.cls[None, :]] = 0.0
+
+    matches = []
+    for flat in np.argsort(iou, axis=None)[::-1]:
+        i, j = np.unravel_index(flat, iou.shape)
+        if iou[i, j] < MATCH_IOU:
+            break
+        if np.isnan(iou[i, j]):
+            continue
+        matches.append((float(iou[i, j]), float(abs(ref.conf[i] - cand.conf[j]))))
+        iou[i, :] = np.nan
+        iou[:, j] = np.nan
+    return matches
+
+
+def compare(frames, reference, candidate, conf=0.5, imgsz=640):
+    """
+    Args:
+        frames: (name, encoded bytes) pairs
+        reference, candidate: model paths
+
+    Returns:
+        dict: JSON-serialisable report with a `passed` verdict
+    """
+    ref_backend = load_backend(reference)
+    cand_backend = load_backend(candidate)
+
+    ref_total = cand_total = count_mismatches = 0
+    ious, conf_diffs = [], []
+    worst = []
+
+    for name, data in frames:
+        image = decode_image(data)
+        ref = ref_backend.detect([image], conf=conf, imgsz=imgsz)[0]
+        cand = cand_backend.detect([image], conf=conf, imgsz=imgsz)[0]
+
+        matches = match_detections(ref, cand)
+        ref_total += len(ref.conf)
+        cand_total += len(cand.conf)
+        ious.extend(m[0] for m in matches)
+        conf_diffs.extend(m[1] for m in matches)
+
+        if len(ref.conf) != len(cand.conf):
+            count_mismatches += 1
+            worst.append({'frame': name, 'reference': len(ref.conf), 'candidate': len(cand.conf)})
+
+    matched_fraction = len(ious) / max(ref_total, cand_total, 1)
+    mismatch_fraction = count_mismatches / max(len(frames), 1)
+
+    return {
+        'reference': os.path.basename(reference),
+        'candidate': os.path.basename(candidate),
+        'frames': len(frames),
+        'detections': {'reference': ref_total, 'candidate': cand_total},
+        'matched_fraction': round(matched_fraction, 4),
+        'mean_iou': round(float(np.mean(ious)), 4) if ious else None,
+        'max_conf_diff': round(float(np.max(conf_diffs)), 4) if conf_diffs else None,
+        'count_mismatch_fraction': round(mismatch_fraction, 4),
+        'count_mismatches': worst[:20],
+        'passed': (matched_fraction >= MIN_MATCHED_FRACTION
+                   and mismatch_fraction <= MAX_COUNT_MISMATCH_FRACTION),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reference', required=True, help='model treated as ground truth (.pt)')
+    parser.add_argument('--candidate', required=True, help='model under test (.onnx)')
+    parser.add_argument('--images', default=DEFAULT_IMAGE_DIR, help='directory of frames')
+    parser.add_argument('--limit', type=int, default=None, help='max frames to load')
+    parser.add_argument('--conf', type=float, default=0.5, help='confidence threshold')
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.images, args.limit)
+    if not frames:
+        parser.error(f"No frames found in {args.images}")
+
+    report = compare(frames, args.reference, args.candidate, conf=args.conf)
+    print(json.dumps(report, indent=4))
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+ROI Mask Cache
+Rasterises each camera's road polygon once per frame shape and reuses it
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+from .roi_finder import select_road_roi
+
+
+# (camera_id, (height, width)) -> cached ROI entry
+_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def _definition(roi_data):
+    """Hashable snapshot of an ROI definition, used to detect edits."""
+    return (
+        tuple(tuple(p) for p in roi_data['polygon']),
+        float(roi_data['real_length_m']),
+        float(roi_data['real_width_m']),
+    )
+
+
+def _build_entry(roi_data, definition, frame_shape):
+    height, width = frame_shape
+    polygon = np.array(roi_data['polygon'], dtype=np.int32)
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.fillPoly(mask, [polygon], 255)
+
+    # Bounding box of the polygon, clipped to the frame
+    x, y, w, h = cv2.boundingRect(polygon)
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, width), min(y + h, height)
+
+    return {
+        'definition': definition,
+        'polygon': polygon,
+        'road_length_m': float(roi_data['real_length_m']),
+        'road_width_m': float(roi_data['real_width_m']),
+        'mask': mask,
+        'bbox': (x0, y0, x1, y1),
+        'bbox_mask': mask[y0:y1, x0:x1],
+    }
+
+
+def get_roi(camera_id, frame_shape):
+    """
+    Return the cached ROI entry for a camera and frame shape.
+
+    The entry holds the polygon, real-world road dimensions, the full-frame
+    uint8 mask and the polygon's bounding box (x0, y0, x1, y1). It is rebuilt
+    whenever the camera's ROI definition changes.
+
+    Args:
+        camera_id (str): Camera identifier
+        frame_shape (tuple): image.shape of the frame
+
+    Returns:
+        dict: cached ROI entry (treat as read-only)
+    """
+    roi_data = select_road_roi(camera_id)
+    definition = _definition(roi_data)
+    key = (camera_id, tuple(frame_shape[:2]))
+
+    entry = _CACHE.get(key)
+    if entry is not None and entry['definition'] == definition:
+        return entry
+
+    entry = _build_entry(roi_data, definition, key[1])
+    with _LOCK:
+        _CACHE[key] = entry
+    return entry
+
+
+def invalidate(camera_id=None):
+    """Drop cached masks for one camera, or for every camera."""
+    with _LOCK:
+        if camera_id is None:
+            _CACHE.clear()
+            return
+        for key in [k for k in _CACHE if k[0] == camera_id]:
+            del _CACHE[key]
@@ -0,0 +1,230 @@
+"""
+ROI Store
+Persistent camera ROI registry (JSON file) with an in-process read-through cache
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Read-only ROIs shipped with the package (the bundled sample cameras)
+SEED_PATH = os.path.join(CURRENT_DIR, "roi_db.json")
+
+# Writable store, outside the source tree; entries override the seed
+ROI_DB_PATH = os.environ.get(
+    "DIMITO_ROI_DB",
+    os.path.join(os.path.expanduser("~"), ".dimito", "roi_db.json")
+)
+
+# Seconds a loaded copy is trusted before the file is checked again
+CACHE_TTL = 30.0
+
+_LOCK = threading.Lock()
+_CACHE = {"data": None, "mtime": None, "loaded_at": 0.0}
+_SEED = None
+
+
+def _read_file(path=ROI_DB_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _write_file(data, path=ROI_DB_PATH):
+    """Atomic write so readers in other processes never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextlib.contextmanager
+def _file_lock(path=ROI_DB_PATH):
+    """
+    Exclusive lock across processes (web workers, CLI) for a
+    read-modify-write of the store, held on <path>.lock.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a+") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 s; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _file_mtime(path=ROI_DB_PATH):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _seed():
+    global _SEED
+    if _SEED is None:
+        _SEED = _read_file(SEED_PATH)
+    return _SEED
+
+
+def _load_all():
+    """Return the cached ROI dict, re-reading the store when stale."""
+    now = time.monotonic()
+    data = _CACHE["data"]
+    if data is not None and now - _CACHE["loaded_at"] < CACHE_TTL:
+        return data
+
+    with _LOCK:
+        mtime = _file_mtime()
+        if _CACHE["data"] is None or mtime != _CACHE["mtime"]:
+            _CACHE["data"] = {**_seed(), **_read_file()}
+            _CACHE["mtime"] = mtime
+        _CACHE["loaded_at"] = now
+        return _CACHE["data"]
+
+
+def validate_roi(polygon, real_length_m, real_width_m):
+    """Normalise and validate an ROI definition. Raises ValueError."""
+    try:
+        points = [[int(x), int(y)] for x, y in polygon]
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("polygon must be a list of (x, y) pixel points")
+
+    if len(points) < 3:
+        raise ValueError("polygon needs at least 3 points")
+
+    try:
+        real_length_m = float(real_length_m)
+        real_width_m = float(real_width_m)
+    except (TypeError, ValueError):
+        raise ValueError("real_length_m and real_width_m must be numbers")
+
+    # Also rejects NaN and infinity
+    if not (0 < real_length_m < float("inf") and 0 < real_width_m < float("inf")):
+        raise ValueError("real_length_m and real_width_m must be positive")
+
+    return {
+        "polygon": points,
+        "real_length_m": real_length_m,
+        "real_width_m": real_width_m,
+    }
+
+
+def get_roi(camera_id):
+    """
+    Return {'polygon', 'real_length_m', 'real_width_m'} for a camera.
+
+    Raises:
+        KeyError: if the camera has no registered ROI
+    """
+    data = _load_all()
+    if camera_id not in data:
+        raise KeyError(f"No ROI registered for camera {camera_id}")
+    return data[camera_id]
+
+
+def list_cameras():
+    return sorted(_load_all().keys())
+
+
+def bulk_import(entries):
+    """
+    Register or update many cameras in one write.
+
+    Args:
+        entries (dict): camera_id -> {'polygon', 'real_length_m', 'real_width_m'}
+
+    Returns:
+        int: number of cameras written
+    """
+    normalised = {
+        camera_id: validate_roi(
+            roi["polygon"], roi["real_length_m"], roi["real_width_m"]
+        )
+        for camera_id, roi in entries.items()
+    }
+
+    # The thread lock orders this process's cache updates; the file lock
+    # keeps other processes from writing in between the read and write
+    with _LOCK, _file_lock():
+        data = _read_file()
+        data.update(normalised)
+        _write_file(data)
+
+        _CACHE["data"] = {**_seed(), **data}
+        _CACHE["mtime"] = _file_mtime()
+        _CACHE["loaded_at"] = time.monotonic()
+
+    return len(normalised)
+
+
+def register_roi(camera_id, polygon, real_length_m, real_width_m):
+    """Register or update a single camera's ROI. Returns the stored entry."""
+    bulk_import({camera_id: {
+        "polygon": polygon,
+        "real_length_m": real_length_m,
+        "real_width_m": real_width_m,
+    }})
+    return get_roi(camera_id)
+
+
+def register_from_image(camera_id, image_path, real_length_m, real_width_m):
+    """
+    Let the user click the road polygon on a sample frame
+    (roi_helper.select_road_roi) and store it for `camera_id`.
+    """
+    from .roi_helper import select_road_roi
+
+    points = select_road_roi(image_path)
+    if not points:
+        print("\n⚠️  No points selected, nothing stored")
+        return None
+    return register_roi(camera_id, points, real_length_m, real_width_m)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "add" and len(sys.argv) == 6:
+        _, _, camera_id, image_path, length_m, width_m = sys.argv
+        print(register_from_image(camera_id, image_path, length_m, width_m))
+    elif len(sys.argv) == 3 and sys.argv[1] == "import":
+        with open(sys.argv[2], "r") as f:
+            print(f"✅ Imported {bulk_import(json.load(f))} cameras")
+    elif len(sys.argv) == 2 and sys.argv[1] == "list":
+        for camera_id in list_cameras():
+            print(camera_id)
+    else:
+        print("Usage: python -m N1T2.roi_store add <camera_id> <image_path> <length_m> <width_m>")
+        print("       python -m N1T2.roi_store import <rois.json>")
+        print("       python -m N1T2.roi_store list")
@@ -3,63 +3,114 @@ Traffic Analyzer Module
 Simple callable function for traffic analysis
 """
 
-from .infer import TrafficAnalyzer
-import json
+from .model_registry import get_analyzer, DEFAULT_MODEL_PATH
+from .artifacts import get_sampler, get_writer
+from .infer import decode_image
 import os
 import cv2
 
 
+MODEL_PATH = DEFAULT_MODEL_PATH
+
+
 def analyze_traffic_image(image_path, camera_id, save_visual=True):
     """
     Analyze a traffic image and return JSON results
-    
+
     Args:
         image_path (str): Path to the input image
         camera_id (str): Camera identifier (e.g., "CC_01")
         save_visual (bool): Whether to save annotated image (default: True)
-    
+
     Returns:
         dict: JSON data containing detection results
     """
-    # Get absolute path to model (relative to this file's location)
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    MODEL_PATH = os.path.join(current_dir, 'runs', 'detect', 'train', 'weights', 'best.pt')
-    OUTPUT_DIR = r'C:\Users\ashut\DiMITO\N1T2\STUB\output'
-    
-    # Validate paths
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found: {image_path}")
-    
+    return analyze_traffic_images([(image_path, camera_id)], save_visual=save_visual)[0]
+
+
+def analyze_traffic_images(items, save_visual=True):
+    """
+    Analyze several traffic images in one batched forward pass
+
+    Args:
+        items (list): (image_path, camera_id) pairs, one per camera
+        save_visual (bool): Whether to save annotated images (default: True)
+
+    Returns:
+        list: JSON data per image, in the same order as `items`
+    """
+    frames = []
+    for image_path, camera_id in items:
+        # Validate paths
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found: {image_path}")
+
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Could not read image: {image_path}")
+
+        # Extract filename
+        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        frames.append((image, camera_id, base_name))
+
+    return analyze_traffic_frames(frames, save_visual=save_visual)
+
+
+def analyze_traffic_frames(frames, save_visual=True, sampled=None):
+    """
+    Analyze already decoded frames (no disk round trip for the input)
+
+    Args:
+        frames (list): (BGR ndarray, camera_id, base_name) triples;
+                       base_name names the saved JSON / annotated image
+        save_visual (bool): Whether to save annotated images (default: True)
+        sampled (list): Per frame, whether to save its artifacts
+                        (default: every Nth frame per camera in this process)
+
+    Returns:
+        list: JSON data per frame, in the same order as `frames`
+    """
     if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
-    
-    # Create output directories
-    os.makedirs(os.path.join(OUTPUT_DIR, "output_json"), exist_ok=True)
-    if save_visual:
-        os.makedirs(os.path.join(OUTPUT_DIR, "output_images"), exist_ok=True)
-    
-    # Initialize analyzer
-    analyzer = TrafficAnalyzer(MODEL_PATH, OUTPUT_DIR)
-    
-    # Run prediction
-    result = analyzer.predict(
-        image_path=image_path,
-        camera_id=camera_id,
-        save_visual=save_visual
+
+    # Artifacts are written in the background, for sampled frames only
+    writer = get_writer()
+    if sampled is None:
+        sampler = get_sampler()
+        sampled = [sampler.should_sample(camera_id) for _, camera_id, _ in frames]
+
+    # Shared analyzer (weights loaded once per process)
+    analyzer = get_analyzer(MODEL_PATH)
+
+    # Run prediction (annotate only the frames that will be saved)
+    results = analyzer.predict_batch(
+        [(image, camera_id) for image, camera_id, _ in frames],
+        save_visual=[save_visual and keep for keep in sampled]
     )
-    
-    # Extract filename
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-    
-    # Save JSON
-    json_path = os.path.join(OUTPUT_DIR, f"output_json/{base_name}.json")
-    with open(json_path, "w") as f:
-        json.dump(result["json"], f, indent=4)
-    
-    # Save image if requested
-    if save_visual and result["img"] is not None:
-        image_path = os.path.join(OUTPUT_DIR, f"output_images/{base_name}.jpg")
-        cv2.imwrite(image_path, result["img"])
-    
+
+    for (_, _, base_name), keep, result in zip(frames, sampled, results):
+        if keep:
+            writer.submit(base_name, result["json"], result["img"])
+
     # Return JSON data
-    return result["json"]
\ No newline at end of file
+    return [result["json"] for result in results]
+
+
+def analyze_encoded_frames(payloads, save_visual=True, sampled=None):
+    """
+    Analyze encoded images (JPEG/PNG bytes) without touching disk
+
+    Args:
+        payloads (list): (encoded bytes, camera_id, base_name) triples
+        save_visual (bool): Whether to save annotated images (default: True)
+        sampled (list): Per frame, whether to save its artifacts (see
+                        analyze_traffic_frames)
+
+    Returns:
+        list: JSON data per image, in the same order as `payloads`
+    """
+    frames = [
+        (decode_image(data), camera_id, base_name)
+        for data, camera_id, base_name in payloads
+    ]
+    return analyze_traffic_frames(frames, save_visual=save_visual, sampled=sampled)
@@ -101,3 +101,31 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# ML (N1T2)
+# Load detector weights when the traffic app starts instead of on first request
+
+ML_WARMUP_ON_STARTUP = True
+
+# Inference worker processes (0 = run inline in the request thread)
+ML_WORKERS = 2
+
+# Requests allowed to wait for a free worker before answering 503
+ML_QUEUE_SIZE = 8
+
+# Seconds a request waits for its results before answering 504
+ML_TIMEOUT_S = 30
+
+
+# Routing
+# Routing updates run in a dedicated `manage.py run_routing_scheduler`
+# process. Enabling this instead starts a scheduler in every web worker;
+# a Mongo lease (ROUTING_LEASE_S) lets only one of them update at a time
+
+ROUTING_SCHEDULER_ENABLED = False
+
+ROUTING_INTERVAL_S = 5.0
+
+# Seconds a routing updater keeps leadership without renewing it
+ROUTING_LEASE_S = 30.0
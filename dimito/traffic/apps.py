@@ -1,6 +1,45 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TrafficConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'traffic'
+
+    def ready(self):
+        if not self._serves_requests():
+            # migrate, check_indexes, run_routing_scheduler, ... need
+            # neither the weights nor a scheduler
+            return
+
+        if getattr(settings, "ROUTING_SCHEDULER_ENABLED", False):
+            from traffic.services.routing_scheduler import get_scheduler
+            get_scheduler().start()
+
+        # Load YOLO weights once at startup so the first green request
+        # does not pay for it
+        if getattr(settings, "ML_WARMUP_ON_STARTUP", False):
+            if getattr(settings, "ML_WORKERS", 0) > 0:
+                # Weights live in the worker processes, not in this one
+                from traffic.services.inference_pool import start_pool
+                try:
+                    start_pool()
+                except Exception as e:
+                    print(f"⚠️  Inference pool not started, workers spawn on first request: {e}")
+                return
+
+            from N1T2.model_registry import warm_up
+            try:
+                warm_up()
+            except Exception as e:
+                print(f"⚠️  Model warm-up skipped: {e}")
+
+    @staticmethod
+    def _serves_requests():
+        """False for the autoreloader parent and one-off management commands."""
+        if "runserver" in sys.argv:
+            return os.environ.get("RUN_MAIN") == "true" or "--noreload" in sys.argv
+        return "manage.py" not in os.path.basename(sys.argv[0])
@@ -2,7 +2,7 @@
 from mongoengine import Document, EmbeddedDocument
 from mongoengine.fields import (
     StringField, FloatField, IntField, BooleanField,
-    DictField, DateTimeField, ReferenceField
+    DictField, DateTimeField, ReferenceField, ListField
 )
 from datetime import datetime
 
@@ -68,6 +68,22 @@ class Edge(Document):
     
     meta = {
         'collection': 'edges',
+        'indexes': [
+            {
+                # green requests: outgoing edges of a node
+                'fields': ('out_node_id', 'is_active'),
+                'name': 'out_active_idx'
+            },
+            {
+                'fields': ('in_node_id', 'is_active'),
+                'name': 'in_active_idx'
+            },
+            {
+                # routing updates: every active edge
+                'fields': ['is_active'],
+                'name': 'active_idx'
+            }
+        ]
     }
     
     def __str__(self):
@@ -107,4 +123,61 @@ class RoutingEntry(Document):
         ]
     }
 
-  
\ No newline at end of file
+
+class RoutingTableVersion(Document):
+    """
+    Per-node routing table version, bumped whenever that node's
+    RoutingEntry rows are written (used for caching / ETags)
+    """
+    node_id = StringField(required=True, unique=True)
+    version = IntField(default=0)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'routing_table_versions',
+    }
+
+
+class RoutingTableChange(Document):
+    """
+    Destinations whose routes changed in one version of a node's table.
+    Lets node servers fetch deltas instead of full tables; expires after
+    an hour (older clients just get a full table). Timestamps are UTC,
+    which is what the TTL index compares against.
+    """
+    node_id = StringField(required=True)
+    version = IntField(required=True)
+    destinations = ListField(StringField())
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'routing_table_changes',
+        'indexes': [
+            {
+                'fields': ('node_id', 'version'),
+                'unique': True,
+                'name': 'node_version_idx'
+            },
+            {
+                'fields': ['created_at'],
+                'expireAfterSeconds': 3600,
+                'name': 'change_ttl_idx'
+            }
+        ]
+    }
+
+
+class SchedulerLease(Document):
+    """
+    Leadership lease for a background job: only the process named in
+    `owner` may run it until `expires_at` (renewed every run). The holder
+    keeps its run stats in `status`
+    """
+    name = StringField(required=True, unique=True)
+    owner = StringField(required=True)
+    expires_at = DateTimeField(required=True)
+    status = DictField()
+
+    meta = {
+        'collection': 'scheduler_leases',
+    }
@@ -0,0 +1,107 @@
+import gzip
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from traffic.db.models import Node
+from traffic.services.routing_service import get_routing_table
+from traffic.services.table_export import msgpack
+from traffic.views import bulk_tables
+
+
+# Never a real node: must be left out of the export
+UNKNOWN_NODE = "__bulk_check__"
+
+
+def decode(body, encoding, compressed):
+    """Records of a bulk export body."""
+    if compressed:
+        body = gzip.decompress(body)
+    if encoding == "msgpack":
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(body)
+        return list(unpacker)
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+def normalise(routing_table):
+    return {
+        dest: sorted((hop["next_hop"], hop["prob"]) for hop in hops)
+        for dest, hops in routing_table.items()
+    }
+
+
+class Command(BaseCommand):
+    help = "Fetch the bulk routing table export in every encoding and compare it with the per-node tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nodes",
+            help="Comma-separated node ids to request (default: every node)"
+        )
+
+    def handle(self, *args, **options):
+        if options["nodes"]:
+            requested = options["nodes"].split(",")
+        else:
+            requested = [doc["node_id"] for doc in Node._get_collection().find({}, {"_id": 0, "node_id": 1})]
+
+        active = sorted(
+            doc["node_id"]
+            for doc in Node._get_collection().find(
+                {"node_id": {"$in": requested}, "is_active": True},
+                {"_id": 0, "node_id": 1}
+            )
+        )
+        expected = {}
+        for node_id in active:
+            version, routing_table = get_routing_table(node_id)
+            expected[node_id] = (version, normalise(routing_table))
+
+        encodings = ["ndjson"]
+        if msgpack is not None:
+            encodings.append("msgpack")
+        else:
+            self.stdout.write(self.style.WARNING("⚠️  msgpack is not installed, skipping it"))
+
+        factory = APIRequestFactory()
+        nodes_param = ",".join(requested + [UNKNOWN_NODE])
+        failures = 0
+
+        for encoding in encodings:
+            for compressed in (False, True):
+                params = {"nodes": nodes_param, "encoding": encoding}
+                if compressed:
+                    params["compress"] = "gzip"
+                label = encoding + (" + gzip" if compressed else "")
+
+                response = bulk_tables(factory.get("/api/gettable/bulk/", params))
+                if response.status_code != 200:
+                    failures += 1
+                    self.stdout.write(self.style.WARNING(f"❌ {label}: HTTP {response.status_code}"))
+                    continue
+
+                records = decode(b"".join(response.streaming_content), encoding, compressed)
+                got = {
+                    r["node_id"]: (r["version"], normalise(r["routing_table"]))
+                    for r in records
+                }
+
+                problems = []
+                if [r["node_id"] for r in records] != active:
+                    problems.append(f"nodes {sorted(got)} != active {active}")
+                problems.extend(
+                    f"{node_id} differs from /gettable/"
+                    for node_id in active
+                    if node_id in got and got[node_id] != expected[node_id]
+                )
+
+                if problems:
+                    failures += 1
+                    self.stdout.write(self.style.WARNING(f"❌ {label}: {'; '.join(problems)}"))
+                else:
+                    self.stdout.write(f"✅ {label}: {len(records)} tables")
+
+        if failures:
+            raise CommandError(f"{failures} bulk export checks failed")
@@ -0,0 +1,176 @@
+import random
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from mongoengine import get_connection, register_connection
+from mongoengine.context_managers import switch_db
+
+from traffic.db.models import Edge, RoutingEntry, RoutingTableChange, RoutingTableVersion
+from traffic.services.dv_service import (
+    MAX_INFLATION, SETTLE_EPS, link_nodes, shortest_costs, traffic_cost
+)
+from traffic.services.incremental_router import IncrementalRouter
+
+
+ALIAS = "router_check"
+MODELS = (Edge, RoutingEntry, RoutingTableChange, RoutingTableVersion)
+
+# Runs allowed for one round of changes to settle under ALPHA smoothing
+MAX_RUNS_PER_ROUND = 200
+
+
+def expected_routes(links):
+    """
+    {(A, D, B): cost} the router should converge to, straight from the
+    definition: a self route per node, plus every hop B of A whose cost
+    to D is within MAX_INFLATION of A's best (direct links always).
+    """
+    dist = shortest_costs(links)
+    out_links = defaultdict(list)
+    for (A, B), cost_AB in links.items():
+        out_links[A].append((B, cost_AB))
+
+    routes = {}
+    for A in link_nodes(links):
+        routes[(A, A, A)] = 0.0
+        for D, to_D in dist.items():
+            if D == A:
+                continue
+            for B, cost_AB in out_links[A]:
+                if B not in to_D:
+                    continue
+                target = cost_AB + to_D[B]
+                if D == B or target <= to_D[A] * MAX_INFLATION:
+                    routes[(A, D, B)] = target
+    return routes
+
+
+def random_traffic(rng):
+    return {
+        "queue_length_m": rng.uniform(0, 120),
+        "pressure": rng.uniform(0, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the incremental router on a random graph in a scratch database "
+        "and check every round against the converged routes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nodes", type=int, default=30)
+        parser.add_argument("--degree", type=int, default=3, help="Outgoing edges per node")
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--db", default="dimito_router_check",
+            help="Scratch database (dropped before and after the check)"
+        )
+        parser.add_argument("--host", default="mongodb://localhost:27017")
+
+    def handle(self, *args, **options):
+        if options["db"] == "dimito":
+            raise CommandError("Refusing to use the application database as scratch space")
+
+        register_connection(ALIAS, db=options["db"], host=f"{options['host']}/{options['db']}")
+        client = get_connection(ALIAS)
+        client.drop_database(options["db"])
+
+        try:
+            with ExitStack() as stack:
+                for model in MODELS:
+                    stack.enter_context(switch_db(model, ALIAS))
+                failures = self.run_rounds(options)
+        finally:
+            client.drop_database(options["db"])
+
+        if failures:
+            raise CommandError(f"{failures} of {options['rounds'] + 1} rounds disagree with the converged routes")
+
+    def run_rounds(self, options):
+        rng = random.Random(options["seed"])
+        nodes = [f"N{i}" for i in range(options["nodes"])]
+
+        edges = []
+        for i, A in enumerate(nodes):
+            # A ring keeps the graph connected; extra edges add alternatives
+            targets = {nodes[(i + 1) % len(nodes)]}
+            targets.update(rng.sample(nodes, options["degree"]))
+            targets.discard(A)
+            for B in targets:
+                edges.append(Edge(
+                    edge_id=f"{A}-{B}",
+                    in_node_id=A,
+                    out_node_id=B,
+                    camera_id=f"cam-{A}-{B}",
+                    road_length_m=rng.uniform(50, 500),
+                    road_width_m=7.0,
+                    outgoing_traffic=random_traffic(rng),
+                ))
+        Edge.objects.insert(edges)
+
+        router = IncrementalRouter()
+        failures = 0
+        for round_no in range(options["rounds"] + 1):
+            if round_no:
+                self.perturb(rng, edges)
+
+            runs, writes = 0, 0
+            while runs < MAX_RUNS_PER_ROUND:
+                changed = router.run()
+                runs += 1
+                writes += len(changed)
+                if not changed and not router.pending:
+                    break
+
+            problems = self.compare(edges)
+            if runs == MAX_RUNS_PER_ROUND:
+                problems.append(f"still writing after {runs} runs")
+
+            label = "initial" if not round_no else f"round {round_no}"
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.WARNING(f"❌ {label}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f"✅ {label}: settled after {runs} runs, {writes} writes")
+        return failures
+
+    def perturb(self, rng, edges):
+        """New traffic on some edges; now and then an edge closes or reopens."""
+        for edge in rng.sample(edges, max(1, len(edges) // 10)):
+            edge.outgoing_traffic = random_traffic(rng)
+            if rng.random() < 0.2:
+                edge.is_active = not edge.is_active
+            edge.save()
+
+    def compare(self, edges):
+        links = {}
+        for e in edges:
+            if e.is_active:
+                cost = traffic_cost(e.outgoing_traffic, e.road_length_m)
+                key = (e.in_node_id, e.out_node_id)
+                links[key] = min(cost, links.get(key, float("inf")))
+        expected = expected_routes(links)
+
+        stored = {
+            (r["from_node_id"], r["destination_node_id"], r["next_hop_node_id"]): r["cost"]
+            for r in RoutingEntry._get_collection().find({}, {"_id": 0})
+        }
+
+        problems = []
+        missing = set(expected) - set(stored)
+        extra = set(stored) - set(expected)
+        if missing:
+            problems.append(f"{len(missing)} missing, e.g. {sorted(missing)[:3]}")
+        if extra:
+            problems.append(f"{len(extra)} stale, e.g. {sorted(extra)[:3]}")
+
+        off = [
+            key for key in set(expected) & set(stored)
+            if abs(stored[key] - expected[key]) > SETTLE_EPS
+        ]
+        if off:
+            problems.append(f"{len(off)} costs off by more than SETTLE_EPS, e.g. {sorted(off)[:3]}")
+        return problems
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from traffic.db.models import (
+    Node, Edge, RoutingEntry, RoutingTableVersion, RoutingTableChange,
+    SchedulerLease
+)
+
+
+MODELS = (Node, Edge, RoutingEntry, RoutingTableVersion, RoutingTableChange,
+          SchedulerLease)
+
+# Placeholder id: the plan shape does not depend on the value
+SAMPLE_ID = "__index_check__"
+
+# (label, model, filter, sort) for the hot queries of the app
+QUERIES = (
+    ("green: outgoing edges of a node", Edge,
+     {"out_node_id": SAMPLE_ID, "is_active": True}, None),
+    ("adjacency: incoming edges", Edge, {"in_node_id": SAMPLE_ID}, None),
+    ("adjacency: outgoing edges", Edge, {"out_node_id": SAMPLE_ID}, None),
+    ("routing: active edges", Edge, {"is_active": True}, None),
+    ("traffic update: edge by id", Edge, {"edge_id": SAMPLE_ID}, None),
+    ("table: routes of a node", RoutingEntry, {"from_node_id": SAMPLE_ID}, None),
+    ("bulk export: routes by node", RoutingEntry, {}, [("from_node_id", 1)]),
+    ("table: version of a node", RoutingTableVersion, {"node_id": SAMPLE_ID}, None),
+    ("delta: change log of a node", RoutingTableChange,
+     {"node_id": SAMPLE_ID, "version": {"$gt": 0, "$lte": 1}}, None),
+    ("node lookup", Node, {"node_id": SAMPLE_ID, "is_active": True}, None),
+)
+
+
+def plan_stages(plan):
+    """All (stage, index name) pairs in an explain() plan tree."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append((plan["stage"], plan.get("indexName")))
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+class Command(BaseCommand):
+    help = "Create declared indexes and report hot queries that need a collection scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-create", action="store_true",
+            help="Only explain, do not create missing indexes"
+        )
+        parser.add_argument(
+            "--strict", action="store_true",
+            help="Exit with an error if any query uses a collection scan"
+        )
+
+    def handle(self, *args, **options):
+        if not options["no_create"]:
+            for model in MODELS:
+                model.ensure_indexes()
+                self.stdout.write(f"🗂️  Indexes ensured: {model._meta['collection']}")
+
+        scans = []
+        for label, model, query, sort in QUERIES:
+            cursor = model._get_collection().find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+
+            winning = cursor.explain()["queryPlanner"]["winningPlan"]
+            stages = plan_stages(winning)
+            indexes = sorted({name for _, name in stages if name})
+
+            if any(stage == "COLLSCAN" for stage, _ in stages):
+                scans.append(label)
+                self.stdout.write(self.style.WARNING(f"❌ COLLSCAN  {label}"))
+            else:
+                self.stdout.write(f"✅ {', '.join(indexes) or 'no scan'}  {label}")
+
+        if scans and options["strict"]:
+            raise CommandError(f"{len(scans)} queries use a collection scan")
+
+        self.stdout.write(f"{len(QUERIES) - len(scans)}/{len(QUERIES)} queries use an index")
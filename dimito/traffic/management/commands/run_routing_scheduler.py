@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from traffic.services.routing_scheduler import RoutingScheduler, get_lease
+
+
+class Command(BaseCommand):
+    help = "Run routing updates periodically in the foreground (dedicated process)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=float,
+            default=float(getattr(settings, "ROUTING_INTERVAL_S", 5.0)),
+            help="Seconds between routing updates"
+        )
+
+    def handle(self, *args, **options):
+        # The lease keeps a second copy of this command on standby
+        scheduler = RoutingScheduler(
+            interval_s=options["interval"],
+            lease=get_lease()
+        )
+        self.stdout.write(f"🛣️  Routing scheduler running every {options['interval']}s")
+        try:
+            scheduler.loop()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        self.stdout.write(str(scheduler.stats))
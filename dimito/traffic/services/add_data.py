@@ -1,9 +1,12 @@
 from datetime import datetime
 import time
 
+from pymongo import UpdateOne
+
 from dimito.mongo import connect_mongo
 from traffic.db.models import Node, Edge
 from traffic.db.models import RoutingEntry
+from traffic.services.routing_versions import bump_versions
 
 
 
@@ -61,25 +64,39 @@ def add_edge(edge_id: str, name: str, in_node_id: str, out_node_id: str,
 
 def get_edges_for_node(node_id: str):
 	"""Return all edges connected to `node_id` (incoming and outgoing)."""
-	incoming = list(Edge.objects(to_node_id=node_id))
-	outgoing = list(Edge.objects(from_node_id=node_id))
+	incoming = list(Edge.objects(in_node_id=node_id))
+	outgoing = list(Edge.objects(out_node_id=node_id))
 	return {
 		"incoming": incoming,
 		"outgoing": outgoing
 	}
 
 
+def _traffic_set(field: str, updates: dict, now: int):
+	"""Internal: $set document touching only the given traffic subfields."""
+	for k in updates:
+		if not isinstance(k, str) or not k or "." in k or k.startswith("$"):
+			raise ValueError(f"Invalid traffic field name: {k!r}")
+
+	fields = {f"{field}.{k}": v for k, v in updates.items()}
+	fields[f"{field}.last_update_ts"] = now
+	return {"$set": fields}
+
+
 def _apply_traffic_update(edge, field: str, updates: dict):
-	"""Internal: merge updates into edge.{field} and save timestamp."""
+	"""Internal: atomically $set updates into edge.{field} with a timestamp."""
 	assert field in ("incoming_traffic", "outgoing_traffic")
-	data = getattr(edge, field) or {}
-	# Merge numeric fields; replace others
-	for k, v in updates.items():
-		data[k] = v
+	now = int(time.time())
+	Edge._get_collection().update_one(
+		{"_id": edge.pk},
+		_traffic_set(field, updates, now)
+	)
 
-	data["last_update_ts"] = int(time.time())
+	# Mirror the write on the in-memory document for the caller
+	data = getattr(edge, field) or {}
+	data.update(updates)
+	data["last_update_ts"] = now
 	setattr(edge, field, data)
-	edge.save()
 	return edge
 
 
@@ -104,6 +121,60 @@ def update_traffic_by_node(node_id: str, edge_id: str, updates: dict):
     )
 
 
+def bulk_update_traffic_by_node(node_id: str, updates_by_edge: dict):
+	"""
+	Apply many traffic updates from one node in a single bulk write.
+
+	Same rules as update_traffic_by_node, but each edge gets atomic
+	$set operations on the traffic subfields instead of a
+	read-modify-write of the whole document.
+
+	Args:
+		node_id: node reporting the traffic
+		updates_by_edge: {edge_id: {metric: value, ...}}
+
+	Returns:
+		{"updated": [edge_id, ...], "not_connected": [edge_id, ...]}
+	"""
+	if not updates_by_edge:
+		return {"updated": [], "not_connected": []}
+
+	now = int(time.time())
+	ops = []
+	for edge_id, updates in updates_by_edge.items():
+		# At most one of the two filters matches a given edge
+		ops.append(UpdateOne(
+			{"edge_id": edge_id, "out_node_id": node_id},
+			_traffic_set("outgoing_traffic", updates, now)
+		))
+		ops.append(UpdateOne(
+			{"edge_id": edge_id, "in_node_id": node_id, "out_node_id": {"$ne": node_id}},
+			_traffic_set("incoming_traffic", updates, now)
+		))
+
+	result = Edge._get_collection().bulk_write(ops, ordered=False)
+
+	not_connected = []
+	if result.matched_count < len(updates_by_edge):
+		# Only on the error path: find which edges matched neither filter
+		connected = {
+			e["edge_id"]
+			for e in Edge._get_collection().find(
+				{
+					"edge_id": {"$in": list(updates_by_edge)},
+					"$or": [{"out_node_id": node_id}, {"in_node_id": node_id}],
+				},
+				{"_id": 0, "edge_id": 1}
+			)
+		}
+		not_connected = [e for e in updates_by_edge if e not in connected]
+
+	return {
+		"updated": [e for e in updates_by_edge if e not in not_connected],
+		"not_connected": not_connected
+	}
+
+
 def add_routing_entry(from_node, dest_node, next_hop, cost):
     entry = RoutingEntry(
         from_node_id=from_node,
@@ -113,4 +184,5 @@ def add_routing_entry(from_node, dest_node, next_hop, cost):
         last_updated=datetime.now()
     )
     entry.save()
+    bump_versions({from_node: [dest_node]})
     return entry
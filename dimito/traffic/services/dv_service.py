@@ -1,156 +1,430 @@
+from collections import defaultdict
 from datetime import datetime
+import heapq
+
+from pymongo import DeleteOne, UpdateOne
+
 from ..db.models import Edge, RoutingEntry
+from .routing_versions import bump_versions
 
 ALPHA = 0.2
 MAX_INFLATION = 1.5
 
+# Smoothed costs closer than this to their target count as converged
+SETTLE_EPS = 0.01
 
-def edge_cost(edge: Edge):
-    t = edge.outgoing_traffic or {}
+
+def traffic_cost(outgoing_traffic, road_length_m):
+    t = outgoing_traffic or {}
     return (
         0.6 * t.get("queue_length_m", 0.0)
         + 0.3 * t.get("pressure", 0.0) * 100
-        + 0.1 * edge.road_length_m
+        + 0.1 * road_length_m
     )
 
 
+def edge_cost(edge: Edge):
+    return traffic_cost(edge.outgoing_traffic, edge.road_length_m)
+
+
+def shortest_costs(link_costs):
+    """
+    All-destinations Dijkstra.
+
+    Args:
+        link_costs: {(A, B): cost} for every directed link A -> B
+
+    Returns:
+        {D: {A: cheapest cost from A to D}}  (D itself maps to 0.0)
+    """
+    reverse = reverse_links(link_costs)
+    return {D: costs_to(D, reverse) for D in link_nodes(link_costs)}
+
+
+def reverse_links(link_costs):
+    """{B: [(A, cost), ...]} - who can reach B in one hop."""
+    reverse = defaultdict(list)
+    for (A, B), cost in link_costs.items():
+        reverse[B].append((A, cost))
+    return reverse
+
+
+def link_nodes(link_costs):
+    nodes = set()
+    for A, B in link_costs:
+        nodes.add(A)
+        nodes.add(B)
+    return nodes
+
+
+def costs_to(D, reverse):
+    """Single-destination Dijkstra: {A: cheapest cost from A to D}."""
+    to_D = {D: 0.0}
+    heap = [(0.0, D)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > to_D[node]:
+            continue
+        for prev, cost in reverse[node]:
+            nd = d + cost
+            if nd < to_D.get(prev, float("inf")):
+                to_D[prev] = nd
+                heapq.heappush(heap, (nd, prev))
+    return to_D
+
+
+class DVEngine:
+    """
+    Distance-vector state held in memory.
+
+    Loads all active edges and routing entries with one query each,
+    runs the DV phases on plain dicts and writes back only the entries
+    whose cost changed (and deletes the ones removed), in a single bulk
+    operation.
+
+    routes[A][D][B] = cost of reaching D from A via next hop B
+    """
+
+    def __init__(self):
+        self.edges = []          # (A, B, cost_AB) per active edge
+        self.routes = defaultdict(lambda: defaultdict(dict))
+        self._loaded = {}        # (A, D, B) -> cost as read from the DB
+        self._dirty = set()      # (A, D, B) touched this run
+        self._removed = set()    # (A, D, B) deleted this run
+
+    # ---------- LOAD ----------
+    def load(self, sources=None):
+        """
+        Load active edges and routing entries. With `sources`, only the
+        entries of those from-nodes are loaded (incremental runs).
+        """
+        edge_docs = Edge.objects(is_active=True).only(
+            "in_node_id", "out_node_id", "road_length_m", "outgoing_traffic"
+        ).as_pymongo()
+
+        self.edges = [
+            (
+                e["in_node_id"],
+                e["out_node_id"],
+                traffic_cost(e.get("outgoing_traffic"), e["road_length_m"])
+            )
+            for e in edge_docs
+        ]
+
+        query = {}
+        if sources is not None:
+            query = {"from_node_id": {"$in": list(sources)}}
+
+        cursor = RoutingEntry._get_collection().find(
+            query,
+            {
+                "_id": 0,
+                "from_node_id": 1,
+                "destination_node_id": 1,
+                "next_hop_node_id": 1,
+                "cost": 1,
+            }
+        )
+        for r in cursor:
+            key = (r["from_node_id"], r["destination_node_id"], r["next_hop_node_id"])
+            self.routes[key[0]][key[1]][key[2]] = r["cost"]
+            self._loaded[key] = r["cost"]
+
+        return self
+
+    def nodes(self):
+        all_nodes = set()
+        for A, B, _ in self.edges:
+            all_nodes.add(A)
+            all_nodes.add(B)
+        return all_nodes
+
+    def get(self, A, D, B):
+        return self.routes[A][D].get(B)
+
+    def set(self, A, D, B, cost):
+        self.routes[A][D][B] = cost
+        self._dirty.add((A, D, B))
+        self._removed.discard((A, D, B))
+
+    def remove(self, A, D, B):
+        via = self.routes[A].get(D)
+        if via is not None:
+            via.pop(B, None)
+            if not via:
+                del self.routes[A][D]
+        self._dirty.discard((A, D, B))
+        self._removed.add((A, D, B))
+
+    def drop_outside(self, nodes):
+        """
+        Remove every entry from, to or via a node outside `nodes` (nodes
+        that no longer have an active edge), including ones not loaded.
+        """
+        nodes = list(nodes)
+        cursor = RoutingEntry._get_collection().find(
+            {
+                "$or": [
+                    {"from_node_id": {"$nin": nodes}},
+                    {"destination_node_id": {"$nin": nodes}},
+                    {"next_hop_node_id": {"$nin": nodes}},
+                ]
+            },
+            {
+                "_id": 0,
+                "from_node_id": 1,
+                "destination_node_id": 1,
+                "next_hop_node_id": 1,
+                "cost": 1,
+            }
+        )
+        for r in cursor:
+            key = (r["from_node_id"], r["destination_node_id"], r["next_hop_node_id"])
+            self._loaded[key] = r["cost"]
+            self.remove(*key)
+
+    # ---------- DV PHASES ----------
+    def add_self_routes(self):
+        for node in self.nodes():
+            if self.get(node, node, node) is None:
+                self.set(node, node, node, 0.0)
+
+    def bootstrap(self):
+        for A, B, cost_AB in self.edges:
+            old_cost = self.get(A, B, B)
+            if old_cost is not None:
+                self.set(A, B, B, (1 - ALPHA) * old_cost + ALPHA * cost_AB)
+            else:
+                self.set(A, B, B, cost_AB)
+
+    def propagate(self):
+        """Single DV iteration. Returns number of routes changed."""
+        changes = 0
+        processed = set()  # Avoid processing same route twice
+
+        for A, B, cost_AB in self.edges:
+            # Snapshot of all routes from B (reflects earlier edges of this pass)
+            routes_from_B = [
+                (D, cost)
+                for D, via in self.routes[B].items()
+                for cost in via.values()
+            ]
+
+            for D, cost_BD in routes_from_B:
+                # Skip if destination is source
+                if D == A:
+                    continue
+
+                # Create unique key to avoid duplicates
+                route_key = (A, D, B)
+                if route_key in processed:
+                    continue
+                processed.add(route_key)
+
+                # Calculate new cost: A -> B -> D
+                new_cost = cost_AB + cost_BD
+                old_cost = self.get(A, D, B)
+
+                if old_cost is not None:
+                    # Check inflation limit
+                    if new_cost > old_cost * MAX_INFLATION:
+                        continue
+
+                    # Apply exponential moving average
+                    self.set(A, D, B, (1 - ALPHA) * old_cost + ALPHA * new_cost)
+                    changes += 1
+                else:
+                    # New route - check if competitive
+                    existing = self.routes[A][D]
+                    if existing and new_cost > min(existing.values()) * MAX_INFLATION:
+                        continue
+
+                    self.set(A, D, B, new_cost)
+                    changes += 1
+
+        return changes
+
+    def link_costs(self):
+        """Cheapest active edge per (A, B) pair."""
+        links = {}
+        for A, B, cost_AB in self.edges:
+            if cost_AB < links.get((A, B), float("inf")):
+                links[(A, B)] = cost_AB
+        return links
+
+    def solve(self):
+        """
+        Converged routing in one pass instead of repeated DV iterations.
+
+        Computes exact shortest costs to every destination, then gives each
+        node one entry per competitive next hop (cost via that hop within
+        MAX_INFLATION of the best), smoothed with ALPHA against the stored
+        cost exactly like the DV phases. Entries for hops that are no
+        longer active or competitive, and for nodes that left the graph,
+        are removed. Returns number of routes changed or removed.
+        """
+        self.add_self_routes()
+
+        links = self.link_costs()
+        dist = shortest_costs(links)
+        nodes = link_nodes(links)
+
+        out_links = defaultdict(list)
+        for (A, B), cost_AB in links.items():
+            out_links[A].append((B, cost_AB))
+
+        self.drop_outside(nodes)
+        for A in nodes:
+            for D, to_D in dist.items():
+                self.update_pair(A, D, out_links[A], to_D)
+
+        return len(self.changed_entries()) + len(self._removed_entries())
+
+    def update_pair(self, A, D, hops, to_D):
+        """
+        Move A's entries towards D to their converged values.
+
+        Args:
+            hops: [(B, cost_AB)] links leaving A
+            to_D: {node: shortest cost to D}
+
+        Entries via hops that are gone or no longer competitive with the
+        best path (beyond MAX_INFLATION of it) are removed.
+
+        Returns:
+            True if every entry is within SETTLE_EPS of its target
+            (i.e. further runs would not move it noticeably)
+        """
+        settled = True
+        if D == A:
+            return settled
+
+        keep = set()
+        for B, cost_AB in hops:
+            if B not in to_D:
+                continue
+
+            target = cost_AB + to_D[B]
+            # Direct links always track the edge (bootstrap phase);
+            # other hops only while competitive with the best path
+            if D != B and target > to_D[A] * MAX_INFLATION:
+                continue
+            keep.add(B)
+
+            old_cost = self.get(A, D, B)
+            if old_cost is None:
+                self.set(A, D, B, target)
+                continue
+            if old_cost == target:
+                continue
+
+            new_cost = (1 - ALPHA) * old_cost + ALPHA * target
+            if old_cost > 0:
+                # A cost rises by at most MAX_INFLATION per run
+                new_cost = min(new_cost, old_cost * MAX_INFLATION)
+            self.set(A, D, B, new_cost)
+            if abs(new_cost - target) > SETTLE_EPS:
+                settled = False
+
+        for B in list(self.routes[A].get(D, ())):
+            if B not in keep:
+                self.remove(A, D, B)
+
+        return settled
+
+    # ---------- WRITE BACK ----------
+    def changed_entries(self):
+        """(A, D, B, cost) for entries that are new or whose cost changed."""
+        return [
+            (A, D, B, self.routes[A][D][B])
+            for A, D, B in self._dirty
+            if self._loaded.get((A, D, B)) != self.routes[A][D][B]
+        ]
+
+    def _removed_entries(self):
+        """(A, D, B) for removed entries that exist in the DB."""
+        return [key for key in self._removed if key in self._loaded]
+
+    def flush(self):
+        """
+        Upsert changed entries and delete removed ones in one unordered
+        bulk write. Returns them, removed ones as (A, D, B, None).
+        """
+        changed = self.changed_entries()
+        removed = self._removed_entries()
+        if changed or removed:
+            now = datetime.now()
+            ops = [
+                UpdateOne(
+                    {
+                        "from_node_id": A,
+                        "destination_node_id": D,
+                        "next_hop_node_id": B,
+                    },
+                    {"$set": {"cost": cost, "last_updated": now}},
+                    upsert=True
+                )
+                for A, D, B, cost in changed
+            ]
+            ops.extend(
+                DeleteOne({
+                    "from_node_id": A,
+                    "destination_node_id": D,
+                    "next_hop_node_id": B,
+                })
+                for A, D, B in removed
+            )
+            RoutingEntry._get_collection().bulk_write(ops, ordered=False)
+
+            changed_by_node = defaultdict(set)
+            for A, D, _, _ in changed:
+                changed_by_node[A].add(D)
+            for A, D, _ in removed:
+                changed_by_node[A].add(D)
+            bump_versions(changed_by_node)
+
+        for A, D, B, cost in changed:
+            self._loaded[(A, D, B)] = cost
+        for key in removed:
+            del self._loaded[key]
+        self._dirty.clear()
+        self._removed.clear()
+        return changed + [(A, D, B, None) for A, D, B in removed]
+
+
 def run_dv_update_once():
     """
     Single iteration of distance-vector update.
     Call this multiple times manually for convergence.
     """
-  
-    edges = Edge.objects(is_active=True)
-    
-   
-    # Get all nodes
-    all_nodes = set()
-    for edge in edges:
-        all_nodes.add(edge.in_node_id)
-        all_nodes.add(edge.out_node_id)
-    
- 
+    engine = DVEngine().load()
+
     # ----------------------------
     # PHASE 0: Add self-routes (only first time)
     # ----------------------------
-    for node in all_nodes:
-        entry = RoutingEntry.objects(
-            from_node_id=node,
-            destination_node_id=node,
-            next_hop_node_id=node
-        ).first()
-        
-        if not entry:
-            RoutingEntry(
-                from_node_id=node,
-                destination_node_id=node,
-                next_hop_node_id=node,
-                cost=0.0
-            ).save()
-           
+    engine.add_self_routes()
+
     # ----------------------------
     # PHASE 1: Bootstrap from edges
     # ----------------------------
-    for edge in edges:
-        A = edge.in_node_id
-        B = edge.out_node_id
-        cost_AB = edge_cost(edge)
-        
-        entry = RoutingEntry.objects(
-            from_node_id=A,
-            destination_node_id=B,
-            next_hop_node_id=B
-        ).first()
-
-        if entry:
-            entry.cost = (1 - ALPHA) * entry.cost + ALPHA * cost_AB
-            entry.last_updated = datetime.now()
-            entry.save()
-        else:
-            RoutingEntry(
-                from_node_id=A,
-                destination_node_id=B,
-                next_hop_node_id=B,
-                cost=cost_AB
-            ).save()
-           
+    engine.bootstrap()
+
     # ----------------------------
     # PHASE 2: DV propagation (SINGLE ITERATION)
     # ----------------------------
-    
-    changes = 0
-    processed = set()  # Avoid processing same route twice
-    
-    for edge in edges:
-        A = edge.in_node_id
-        B = edge.out_node_id
-        cost_AB = edge_cost(edge)
-        
-        # Get all routes from B
-        routes_from_B = RoutingEntry.objects(from_node_id=B)
-
-        for r in routes_from_B:
-            D = r.destination_node_id
-            
-            # Skip if destination is source
-            if D == A:
-                continue
+    changes = engine.propagate()
 
-            # Calculate new cost: A -> B -> D
-            new_cost = cost_AB + r.cost
-            
-            # Create unique key to avoid duplicates
-            route_key = (A, D, B)
-            if route_key in processed:
-                continue
-            processed.add(route_key)
-
-            # Check if this specific route exists
-            entry = RoutingEntry.objects(
-                from_node_id=A,
-                destination_node_id=D,
-                next_hop_node_id=B
-            ).first()
-
-            if entry:
-                # Update existing route
-                old_cost = entry.cost
-                
-                # Check inflation limit
-                if new_cost > old_cost * MAX_INFLATION:
-                    continue
-                
-                # Apply exponential moving average
-                entry.cost = (1 - ALPHA) * entry.cost + ALPHA * new_cost
-                entry.last_updated = datetime.now()
-                entry.save()
-                changes += 1
-             
-            else:
-                # New route - check if competitive
-                best_existing = RoutingEntry.objects(
-                    from_node_id=A,
-                    destination_node_id=D
-                ).order_by('cost').first()
-                
-                if best_existing and new_cost > best_existing.cost * MAX_INFLATION:
-                    continue
-                
-                # Create new route
-                RoutingEntry(
-                    from_node_id=A,
-                    destination_node_id=D,
-                    next_hop_node_id=B,
-                    cost=new_cost
-                ).save()
-                changes += 1
-             
-    # Print summary
-    total = RoutingEntry.objects().count()
-   
-    
-    for node in sorted(all_nodes):
-        routes = RoutingEntry.objects(from_node_id=node)
-        dests = set(r.destination_node_id for r in routes)
-      
-    return changes  # Return number of changes (0 = converged)
\ No newline at end of file
+    engine.flush()
+
+    return changes  # Return number of changes (0 = converged)
+
+
+def run_dv_converged():
+    """
+    Converged routing update: one shortest-path solve over all edges
+    instead of calling run_dv_update_once until it stops changing.
+    """
+    engine = DVEngine().load()
+    changes = engine.solve()
+    engine.flush()
+    return changes
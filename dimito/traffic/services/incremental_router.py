@@ -0,0 +1,174 @@
+from collections import defaultdict
+import threading
+
+from .dv_service import (
+    DVEngine, costs_to, link_nodes, reverse_links, shortest_costs
+)
+
+# Link costs this close count as unchanged
+COST_EPS = 1e-9
+
+
+class IncrementalRouter:
+    """
+    Keeps the last shortest-path solution in memory and, on each run,
+    recomputes only the (source, destination) pairs touched by links whose
+    cost changed since the previous run.
+
+    - A destination D is re-solved only if a changed link could alter a
+      shortest path to it (it improves on the current best, or it was tight
+      on a shortest path before the change).
+    - Affected pairs: sources of changed links (all destinations), nodes
+      whose cost to a re-solved D moved, and their upstream neighbours.
+    - Pairs still converging under ALPHA smoothing stay pending until
+      they settle, so they keep moving even if no link changes.
+    """
+
+    def __init__(self):
+        self.links = None        # {(A, B): cost} used by the last run
+        self.dist = {}           # {D: {A: cost}}
+        self.pending = set()     # (A, D) pairs not yet settled
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget the last solution; the next run is a full one."""
+        with self._lock:
+            self.links = None
+            self.dist = {}
+            self.pending = set()
+
+    def changed_links(self, links):
+        old = self.links or {}
+        return {
+            key
+            for key in set(old) | set(links)
+            if key not in old or key not in links
+            or abs(old[key] - links[key]) > COST_EPS
+        }
+
+    def run(self):
+        """
+        One incremental update.
+
+        Returns:
+            list of (from, destination, next_hop, cost) entries written
+        """
+        with self._lock:
+            # Edge costs are cheap to load; routing entries are loaded lazily
+            links = DVEngine().load(sources=()).link_costs()
+
+            if self.links is None:
+                return self._full(links)
+
+            changed = self.changed_links(links)
+            if not changed and not self.pending:
+                return []
+
+            affected = self._affected_pairs(links, changed)
+            new_nodes = link_nodes(links) - link_nodes(self.links)
+            # Nodes that lost every edge take their entries with them
+            gone = bool(link_nodes(self.links) - link_nodes(links))
+            return self._apply(links, affected, new_nodes=new_nodes, prune=gone)
+
+    # ---------- INTERNALS ----------
+    def _full(self, links):
+        self.dist = shortest_costs(links)
+        nodes = link_nodes(links)
+        # Every node, so ones without outgoing links lose stale entries too
+        affected = {
+            (A, D)
+            for A in nodes
+            for D in self.dist
+        }
+        return self._apply(links, affected, new_nodes=nodes, prune=True)
+
+    def _affected_pairs(self, links, changed):
+        old_links = self.links
+        reverse = reverse_links(links)
+        nodes = link_nodes(links)
+
+        affected = set(self.pending)
+        for A, _ in changed:
+            if A in nodes:
+                affected.update((A, D) for D in nodes)
+
+        for D in nodes:
+            old_to_D = self.dist.get(D)
+            if old_to_D is not None and not self._touches(D, old_to_D, changed, old_links, links):
+                continue
+
+            new_to_D = costs_to(D, reverse)
+            self.dist[D] = new_to_D
+
+            moved = {
+                A for A in set(new_to_D) | set(old_to_D or {})
+                if abs(new_to_D.get(A, float("inf")) - (old_to_D or {}).get(A, float("inf"))) > COST_EPS
+            }
+            for A in moved:
+                affected.add((A, D))
+                # Anyone with a link into A sees a new cost via A
+                affected.update((P, D) for P, _ in reverse[A])
+
+        for D in set(self.dist) - nodes:
+            del self.dist[D]
+
+        return {(A, D) for A, D in affected if D in nodes and A in nodes}
+
+    def _touches(self, D, to_D, changed, old_links, links):
+        """Can any changed link alter a shortest path to D?"""
+        for A, B in changed:
+            if B not in to_D:
+                # B cannot reach D, so this link is not on any path to D
+                continue
+            best_A = to_D.get(A, float("inf"))
+
+            new_cost = links.get((A, B))
+            if new_cost is not None and new_cost + to_D[B] < best_A - COST_EPS:
+                return True
+
+            old_cost = old_links.get((A, B))
+            if old_cost is not None and abs(old_cost + to_D[B] - best_A) <= COST_EPS:
+                return True
+
+        return False
+
+    def _apply(self, links, affected, new_nodes=(), prune=False):
+        out_links = defaultdict(list)
+        for (A, B), cost_AB in links.items():
+            out_links[A].append((B, cost_AB))
+
+        engine = DVEngine().load(sources={A for A, _ in affected} | set(new_nodes))
+        if prune:
+            engine.drop_outside(link_nodes(links))
+        for node in new_nodes:
+            if engine.get(node, node, node) is None:
+                engine.set(node, node, node, 0.0)
+
+        pending = set()
+        for A, D in affected:
+            if not engine.update_pair(A, D, out_links[A], self.dist[D]):
+                pending.add((A, D))
+
+        changed = engine.flush()
+
+        self.links = links
+        self.pending = pending
+        return changed
+
+
+_ROUTER = IncrementalRouter()
+
+
+def get_router():
+    """Process-wide incremental router (keeps state between runs)."""
+    return _ROUTER
+
+
+def run_incremental_update():
+    """Recompute routes affected by edge cost changes. Returns the delta."""
+    return _ROUTER.run()
+
+
+def reset_incremental_router():
+    """Make the next update a full one (e.g. after another process wrote routes)."""
+    _ROUTER.reset()
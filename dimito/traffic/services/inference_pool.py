@@ -0,0 +1,142 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from N1T2.artifacts import get_sampler
+from N1T2.model_registry import warm_up
+from N1T2.test_model import analyze_encoded_frames
+
+
+class InferenceBusy(Exception):
+    """Every worker is busy and the submit queue is full."""
+
+
+class InferenceTimeout(Exception):
+    """A request did not get its results within ML_TIMEOUT_S."""
+
+
+_POOL = None
+_SLOTS = None
+_LOCK = threading.Lock()
+
+# After the pool breaks (a worker died, or warm_up failed in the
+# initializer), run inline for this long before spawning a new pool
+POOL_RETRY_S = 60
+_BROKEN_AT = None
+
+
+def _workers():
+    return int(getattr(settings, "ML_WORKERS", 0))
+
+
+def get_pool():
+    """
+    Process pool of model-holding workers, created on first use.
+
+    Each worker loads the weights once (initializer) and keeps them for
+    its lifetime. At most ML_WORKERS + ML_QUEUE_SIZE requests are
+    in flight; anything beyond that is rejected with InferenceBusy.
+    """
+    global _POOL, _SLOTS
+    if _POOL is None:
+        with _LOCK:
+            if _POOL is None:
+                workers = _workers()
+                queue_size = int(getattr(settings, "ML_QUEUE_SIZE", 8))
+                _SLOTS = threading.BoundedSemaphore(workers + queue_size)
+                _POOL = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # torch does not survive fork() once threads exist
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm_up,
+                )
+    return _POOL
+
+
+def start_pool():
+    """Spawn every worker now so the first requests do not pay for it."""
+    if _workers() <= 0:
+        return
+    pool = get_pool()
+    for _ in range(_workers()):
+        pool.submit(int)
+
+
+def _discard_pool(pool):
+    """Drop a broken pool; requests run inline until POOL_RETRY_S passes."""
+    global _POOL, _BROKEN_AT
+    with _LOCK:
+        if _POOL is pool:
+            _POOL = None
+            _BROKEN_AT = time.monotonic()
+    pool.shutdown(wait=False, cancel_futures=True)
+    print(f"⚠️  Inference pool broken, running inline for {POOL_RETRY_S}s")
+
+
+def _pool_available():
+    return _BROKEN_AT is None or time.monotonic() - _BROKEN_AT >= POOL_RETRY_S
+
+
+def run_inference(payloads, save_vis):
+    """
+    Run ML for one request's frames.
+
+    Args:
+        payloads: list of (encoded image bytes, camera_id, base_name)
+        save_vis: whether to save annotated images
+
+    Returns:
+        list of ML result dicts, in the same order as `payloads`
+
+    Raises:
+        InferenceBusy: the pool's queue is full (callers answer 503)
+        InferenceTimeout: no result within ML_TIMEOUT_S
+    """
+    # Artifact sampling is decided here: each worker would otherwise keep
+    # its own per-camera counts and save every Nth frame per worker
+    sampler = get_sampler()
+    sampled = [sampler.should_sample(camera_id) for _, camera_id, _ in payloads]
+
+    if _workers() <= 0 or not _pool_available():
+        # Inline mode: run in the request thread
+        return analyze_encoded_frames(payloads, save_visual=save_vis, sampled=sampled)
+
+    pool = get_pool()
+    # A rebuilt pool gets new slots; each task releases the ones it took
+    slots = _SLOTS
+    if not slots.acquire(blocking=False):
+        raise InferenceBusy("Inference queue is full")
+
+    try:
+        future = pool.submit(
+            analyze_encoded_frames,
+            # memoryviews cannot be pickled
+            [(bytes(data), camera_id, base_name) for data, camera_id, base_name in payloads],
+            save_vis,
+            sampled
+        )
+    except BrokenProcessPool:
+        slots.release()
+        _discard_pool(pool)
+        return analyze_encoded_frames(payloads, save_visual=save_vis, sampled=sampled)
+    except Exception:
+        slots.release()
+        raise
+    # The slot is held until the task really finishes, even past a timeout
+    future.add_done_callback(lambda _: slots.release())
+
+    try:
+        return future.result(timeout=float(getattr(settings, "ML_TIMEOUT_S", 30)))
+    except FutureTimeout:
+        # Only drops a still-queued task; a running one completes in its
+        # worker and keeps its slot until then
+        future.cancel()
+        raise InferenceTimeout("Inference timed out")
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return analyze_encoded_frames(payloads, save_visual=save_vis, sampled=sampled)
@@ -1,37 +1,54 @@
-import tempfile
 import os
-from N1T2.test_model import analyze_traffic_image
+from traffic.services.inference_pool import run_inference
 
 
 def run_ml_for_edge(image_file, camera_id, save_vis):
     """
     Runs ML on an uploaded Django file.
 
-    - Saves file to temp path
-    - Passes file path to ML
-    - Cleans up automatically
+    - Reads the upload straight from memory (no temp file)
+    - Hands it to the inference workers and waits for the result
     """
+    return run_ml_for_edges([(image_file, camera_id)], save_vis)[0]
 
-    # Create a temp file
-    suffix = os.path.splitext(image_file.name)[1] or ".jpg"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        for chunk in image_file.chunks():
-            tmp.write(chunk)
-        tmp_path = tmp.name
-
-    try:
-        result = analyze_traffic_image(
-            image_path=tmp_path,
-            camera_id=camera_id,
-            save_visual=save_vis
-        )
-        
-    
-        print("ML RESULT VALUE:", result)
-
-    finally:
-        # Cleanup temp file
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
-
-    return result
+
+def run_ml_for_edges(uploads, save_vis):
+    """
+    Runs ML on several uploaded Django files in one batch.
+
+    Args:
+        uploads: list of (image_file, camera_id) pairs
+        save_vis: whether to save annotated images
+
+    Returns:
+        list of ML result dicts, in the same order as `uploads`
+
+    Raises:
+        InferenceBusy / InferenceTimeout from the inference pool
+    """
+
+    payloads = []
+    for image_file, camera_id in uploads:
+        base_name = os.path.splitext(os.path.basename(image_file.name))[0]
+        payloads.append((read_upload(image_file), camera_id, base_name))
+
+    results = run_inference(payloads, save_vis)
+
+    print("ML RESULT VALUE:", results)
+
+    return results
+
+
+def read_upload(image_file):
+    """
+    Return the upload's encoded bytes as a memoryview.
+
+    Small uploads already live in memory (InMemoryUploadedFile), so this
+    is just a view over Django's buffer; large ones are read once.
+    """
+    getbuffer = getattr(image_file.file, "getbuffer", None)
+    if getbuffer is not None:
+        return getbuffer()
+
+    image_file.seek(0)
+    return memoryview(image_file.read())
@@ -0,0 +1,218 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from pymongo.errors import DuplicateKeyError
+
+from ..db.models import SchedulerLease
+from .incremental_router import reset_incremental_router, run_incremental_update
+
+
+class Lease:
+    """
+    Mongo lease electing one routing updater across processes.
+
+    Every web worker (and a dedicated scheduler process) may run a
+    RoutingScheduler; only the lease holder actually updates, so the
+    ALPHA smoothing is applied once per tick and bulk writes never race.
+    A holder that dies is replaced once its lease expires.
+    """
+
+    def __init__(self, name="routing", ttl_s=30.0):
+        self.name = name
+        self.ttl_s = ttl_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self):
+        """Take or renew the lease. Returns False if another process holds it."""
+        # UTC, so hosts in different time zones agree on expiry
+        now = datetime.now(timezone.utc)
+        try:
+            SchedulerLease._get_collection().find_one_and_update(
+                {
+                    "name": self.name,
+                    "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}],
+                },
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_s)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Filter missed because someone else holds it; the upsert
+            # then collides with their document
+            return False
+        return True
+
+    def release(self):
+        # Expire rather than delete, so the last recorded status survives
+        SchedulerLease._get_collection().update_one(
+            {"name": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.now(timezone.utc)}}
+        )
+
+    def record(self, status):
+        """Store the holder's status on the lease (read by get_status())."""
+        SchedulerLease._get_collection().update_one(
+            {"name": self.name, "owner": self.owner},
+            {"$set": {"status": status}}
+        )
+
+
+class RoutingScheduler:
+    """
+    Runs the routing update periodically in a background thread.
+
+    - Every tick runs the update; the incremental router compares edge
+      costs itself and returns at once when nothing changed, so traffic
+      writers in any process need not signal the scheduler.
+    - With a `lease`, ticks are skipped while another process holds it.
+      On (re)gaining it, `on_elected` is called first, since routes may
+      have moved under another leader meanwhile. The holder records its
+      stats on the lease after every run, for get_status().
+    """
+
+    def __init__(self, interval_s=5.0, update=run_incremental_update, lease=None,
+                 on_elected=reset_incremental_router):
+        self.interval_s = interval_s
+        self.update = update
+        self.lease = lease
+        self.on_elected = on_elected
+        self.leading = False      # holds the lease since the last tick
+
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.stats = {
+            "runs": 0,
+            "standby": 0,
+            "errors": 0,
+            "last_run_at": None,
+            "last_duration_ms": None,
+            "last_change_count": None,
+            "last_error": None,
+        }
+
+    # ---------- LOOP ----------
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self.loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.step_down()
+
+    def step_down(self):
+        """Give up the lease so another process can take over at once."""
+        self.leading = False
+        if self.lease is not None:
+            try:
+                self.lease.release()
+            except Exception as e:
+                print(f"⚠️  Could not release routing lease: {e}")
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def loop(self):
+        # Fixed cadence measured on the monotonic clock; a slow run
+        # delays the next tick instead of stacking runs
+        next_run = time.monotonic()
+        while not self._stop.wait(max(0.0, next_run - time.monotonic())):
+            self.run_once()
+            next_run = max(next_run + self.interval_s, time.monotonic())
+
+    def run_once(self):
+        if self.lease is not None:
+            try:
+                leader = self.lease.acquire()
+            except Exception as e:
+                self.leading = False
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+                print(f"⚠️  Routing lease check failed: {e}")
+                return None
+            if not leader:
+                self.leading = False
+                self.stats["standby"] += 1
+                return None
+            if not self.leading:
+                self.on_elected()
+                self.leading = True
+
+        self.stats["last_run_at"] = int(time.time())
+        started = time.monotonic()
+        try:
+            changed = self.update()
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            print(f"⚠️  Routing update failed: {e}")
+            self._record()
+            return None
+
+        self.stats["runs"] += 1
+        self.stats["last_duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        self.stats["last_change_count"] = len(changed)
+        self.stats["last_error"] = None
+        self._record()
+        return changed
+
+    def _record(self):
+        if self.lease is None:
+            return
+        try:
+            self.lease.record({"interval_s": self.interval_s, **self.stats})
+        except Exception as e:
+            print(f"⚠️  Could not record routing status: {e}")
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler configured from settings (not started)."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = RoutingScheduler(
+                    interval_s=float(getattr(settings, "ROUTING_INTERVAL_S", 5.0)),
+                    lease=get_lease(),
+                )
+    return _SCHEDULER
+
+
+def get_lease():
+    return Lease(ttl_s=float(getattr(settings, "ROUTING_LEASE_S", 30.0)))
+
+
+def get_status(name="routing"):
+    """
+    Scheduler state as last recorded by the lease holder, whichever
+    process (web worker or run_routing_scheduler) that is.
+    """
+    doc = SchedulerLease._get_collection().find_one(
+        {"name": name}, {"_id": 0, "owner": 1, "expires_at": 1, "status": 1}
+    )
+    if doc is None:
+        return {"running": False, "leader": None}
+
+    expires_at = doc["expires_at"]
+    if expires_at.tzinfo is None:
+        # pymongo hands back naive UTC
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+
+    return {
+        "running": expires_at > datetime.now(timezone.utc),
+        "leader": doc["owner"],
+        "lease_expires_at": expires_at.isoformat(),
+        **doc.get("status", {})
+    }
@@ -1,13 +1,20 @@
-from collections import defaultdict
-import math
-import time
+import threading
+from itertools import groupby
+from operator import itemgetter
 
-from ..db.models import RoutingEntry
+import numpy as np
+
+from ..db.models import Node, RoutingEntry
+from .routing_versions import changed_destinations, get_version, get_versions
 
 
 BETA = 0.08          # randomness control
 MAX_COST_RATIO = 3.3
 
+# node_id -> (version, routing_table)
+_TABLE_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
 
 def build_routing_table_for_node(node_id: str):
     """
@@ -20,42 +27,180 @@ def build_routing_table_for_node(node_id: str):
     }
     """
 
-    routes = RoutingEntry.objects(from_node_id=node_id)
+    # Projection only: no mongoengine document hydration
+    cursor = RoutingEntry._get_collection().find(
+        {"from_node_id": node_id},
+        {
+            "_id": 0,
+            "destination_node_id": 1,
+            "next_hop_node_id": 1,
+            "cost": 1,
+        }
+    )
+
+    return table_from_routes(
+        (r["destination_node_id"], r["next_hop_node_id"], r["cost"])
+        for r in cursor
+    )
 
-    temp = defaultdict(list)
+
+def table_from_routes(routes):
+    """
+    Build a routing table from (destination, next_hop, cost) tuples.
+
+    Near-optimal filtering and the cost -> probability softmax are done
+    for all destinations at once with NumPy.
+    """
+    dest_index = {}
+    codes, next_hops, costs = [], [], []
 
     # Collect costs
-    for r in routes:
-        temp[r.destination_node_id].append(
-            (r.next_hop_node_id, r.cost)
-        )
-
-    routing_table = {}
-
-    for dest, options in temp.items():
-        best_cost = min(cost for _, cost in options)
-
-        # filter near-optimal paths
-        filtered = [
-            (nh, cost)
-            for nh, cost in options
-            if cost <= MAX_COST_RATIO * best_cost
-        ]
-
-        # cost -> probability
-        weights = [
-            (nh, math.exp(-BETA * cost))
-            for nh, cost in filtered
-        ]
-
-        Z = sum(w for _, w in weights)
-
-        routing_table[dest] = [
-            {
-                "next_hop": nh,
-                "prob": round(w / Z, 4)
-            }
-            for nh, w in weights
-        ]
+    for dest, nh, cost in routes:
+        codes.append(dest_index.setdefault(dest, len(dest_index)))
+        next_hops.append(nh)
+        costs.append(cost)
+
+    if not codes:
+        return {}
+
+    codes = np.array(codes, dtype=np.intp)
+    costs = np.array(costs, dtype=np.float64)
+
+    best_cost = np.full(len(dest_index), np.inf)
+    np.minimum.at(best_cost, codes, costs)
+    best_per_route = best_cost[codes]
+
+    # filter near-optimal paths
+    keep = costs <= MAX_COST_RATIO * best_per_route
+
+    # cost -> probability (shifted by the best cost; same ratios, no underflow)
+    weights = np.where(keep, np.exp(-BETA * (costs - best_per_route)), 0.0)
+    Z = np.bincount(codes, weights=weights, minlength=len(dest_index))
+    probs = np.round(weights / Z[codes], 4)
+
+    destinations = list(dest_index)
+    routing_table = {dest: [] for dest in destinations}
+    for i in np.flatnonzero(keep):
+        routing_table[destinations[codes[i]]].append({
+            "next_hop": next_hops[i],
+            "prob": float(probs[i])
+        })
 
     return routing_table
+
+
+def get_routing_table(node_id: str):
+    """
+    Cached routing table for a node.
+
+    The table is rebuilt only when the node's version (bumped by every
+    routing write) differs from the cached one.
+
+    Returns:
+        (version, routing_table)
+    """
+    version = get_version(node_id)
+
+    cached = _TABLE_CACHE.get(node_id)
+    if cached is not None and cached[0] == version:
+        return cached
+
+    entry = (version, build_routing_table_for_node(node_id))
+    with _CACHE_LOCK:
+        _TABLE_CACHE[node_id] = entry
+    return entry
+
+
+def get_routing_delta(node_id: str, since: int):
+    """
+    Changes to a node's routing table after version `since`.
+
+    Returns:
+        None if nothing changed, else
+        {
+          "version": V,
+          "full": bool,            # True -> "updates" is the whole table
+          "updates": {destination: [...]},
+          "removed": [destination, ...]
+        }
+    """
+    version, routing_table = get_routing_table(node_id)
+    if version <= since:
+        return None
+
+    destinations = changed_destinations(node_id, since, version)
+    if destinations is None:
+        return {
+            "version": version,
+            "full": True,
+            "updates": routing_table,
+            "removed": []
+        }
+
+    return {
+        "version": version,
+        "full": False,
+        "updates": {
+            dest: routing_table[dest]
+            for dest in destinations if dest in routing_table
+        },
+        "removed": sorted(dest for dest in destinations if dest not in routing_table)
+    }
+
+
+def iter_routing_tables(node_ids=None):
+    """
+    Routing tables for many active nodes from one query, sorted by node.
+
+    Requested nodes without routes get an empty table; inactive or
+    unknown nodes are skipped (like the single-node endpoint).
+
+    Args:
+        node_ids: list of node ids, or None for the whole network
+
+    Yields:
+        (node_id, version, routing_table)
+    """
+    node_query = {"is_active": True}
+    if node_ids is not None:
+        node_query["node_id"] = {"$in": list(node_ids)}
+    active = sorted(
+        doc["node_id"]
+        for doc in Node._get_collection().find(node_query, {"_id": 0, "node_id": 1})
+    )
+    if not active:
+        return
+
+    route_query = {}
+    if node_ids is not None:
+        route_query = {"from_node_id": {"$in": active}}
+
+    cursor = RoutingEntry._get_collection().find(
+        route_query,
+        {
+            "_id": 0,
+            "from_node_id": 1,
+            "destination_node_id": 1,
+            "next_hop_node_id": 1,
+            "cost": 1,
+        }
+    ).sort("from_node_id", 1)
+
+    versions = get_versions(active if node_ids is not None else None)
+
+    # Merge the sorted node list with the routes grouped by source node
+    groups = groupby(cursor, key=itemgetter("from_node_id"))
+    current, rows = next(groups, (None, ()))
+    for node_id in active:
+        while current is not None and current < node_id:
+            current, rows = next(groups, (None, ()))
+
+        routes = []
+        if current == node_id:
+            routes = [
+                (r["destination_node_id"], r["next_hop_node_id"], r["cost"])
+                for r in rows
+            ]
+            current, rows = next(groups, (None, ()))
+
+        yield node_id, versions.get(node_id, 0), table_from_routes(routes)
@@ -0,0 +1,170 @@
+import threading
+import time
+from datetime import datetime
+
+from pymongo import InsertOne, ReturnDocument
+
+from ..db.models import RoutingTableChange, RoutingTableVersion
+
+
+def bump_versions(changes):
+    """
+    Increment the routing table version of every changed node and log
+    which destinations changed (so node servers can fetch deltas).
+    Call after writing those nodes' RoutingEntry rows.
+
+    Args:
+        changes: {node_id: iterable of destination ids}
+    """
+    if not changes:
+        return
+
+    # UTC: the change log's TTL index expires against it
+    now = datetime.utcnow()
+    versions = RoutingTableVersion._get_collection()
+
+    # One atomic increment per node, logging exactly the version it
+    # produced: concurrent writers can never label two changes alike
+    logs, bumped = [], {}
+    for node_id, destinations in changes.items():
+        doc = versions.find_one_and_update(
+            {"node_id": node_id},
+            {"$inc": {"version": 1}, "$set": {"updated_at": now}},
+            projection={"_id": 0, "version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        bumped[node_id] = doc["version"]
+        logs.append(InsertOne({
+            "node_id": node_id,
+            "version": doc["version"],
+            "destinations": sorted(set(destinations)),
+            "created_at": now,
+        }))
+
+    RoutingTableChange._get_collection().bulk_write(logs, ordered=False)
+
+    # Wake long-polls in this process right away (others see it on the
+    # next shared poll)
+    get_watch().publish(bumped)
+
+
+def get_version(node_id):
+    """Current routing table version of a node (0 if never written)."""
+    doc = RoutingTableVersion._get_collection().find_one(
+        {"node_id": node_id}, {"_id": 0, "version": 1}
+    )
+    return doc["version"] if doc else 0
+
+
+def get_versions(node_ids=None):
+    """{node_id: version} for the given nodes (or every node) in one query."""
+    query = {}
+    if node_ids is not None:
+        query = {"node_id": {"$in": list(node_ids)}}
+    return {
+        doc["node_id"]: doc["version"]
+        for doc in RoutingTableVersion._get_collection().find(
+            query, {"_id": 0, "node_id": 1, "version": 1}
+        )
+    }
+
+
+def changed_destinations(node_id, since, until):
+    """
+    Destinations changed in versions (since, until] of a node's table.
+
+    Returns:
+        set of destination ids, or None if part of that history has
+        expired (caller should send the full table instead)
+    """
+    if since <= 0:
+        return None
+
+    logs = list(RoutingTableChange._get_collection().find(
+        {"node_id": node_id, "version": {"$gt": since, "$lte": until}},
+        {"_id": 0, "version": 1, "destinations": 1}
+    ))
+    if len(logs) != until - since:
+        return None
+
+    destinations = set()
+    for log in logs:
+        destinations.update(log["destinations"])
+    return destinations
+
+
+class VersionWatch:
+    """
+    Lets long-poll requests wait for routing version changes.
+
+    One background thread per process polls the versions of the nodes
+    that have waiters (a single query per interval, however many
+    watchers) and wakes them through a Condition. bump_versions() in the
+    same process publishes immediately.
+    """
+
+    def __init__(self, poll_s=1.0):
+        self.poll_s = poll_s
+        self._cond = threading.Condition()
+        self._versions = {}      # node_id -> latest version seen
+        self._waiting = {}       # node_id -> number of waiters
+        self._thread = None
+
+    def publish(self, versions):
+        with self._cond:
+            for node_id, version in versions.items():
+                if version > self._versions.get(node_id, 0):
+                    self._versions[node_id] = version
+            self._cond.notify_all()
+
+    def wait(self, node_id, since, timeout):
+        """
+        Block until node_id's version exceeds `since` or `timeout` passes.
+
+        Returns:
+            True if the version moved past `since`
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting[node_id] = self._waiting.get(node_id, 0) + 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            try:
+                while self._versions.get(node_id, 0) <= since:
+                    remaining = deadline - time.monotonic()
+                    if not remaining > 0:   # also stops on a NaN timeout
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._waiting[node_id] -= 1
+                if not self._waiting[node_id]:
+                    del self._waiting[node_id]
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_s)
+            with self._cond:
+                node_ids = list(self._waiting)
+            if not node_ids:
+                continue
+            try:
+                self.publish(get_versions(node_ids))
+            except Exception as e:
+                print(f"⚠️  Routing version poll failed: {e}")
+
+
+_WATCH = None
+_WATCH_LOCK = threading.Lock()
+
+
+def get_watch(poll_s=1.0):
+    """Process-wide VersionWatch (poller starts with the first waiter)."""
+    global _WATCH
+    if _WATCH is None:
+        with _WATCH_LOCK:
+            if _WATCH is None:
+                _WATCH = VersionWatch(poll_s)
+    return _WATCH
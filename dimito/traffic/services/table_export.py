@@ -0,0 +1,60 @@
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for encoding=msgpack
+    msgpack = None
+
+from .routing_service import iter_routing_tables
+
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "msgpack": "application/x-msgpack",
+}
+
+
+def encode_tables(tables, fmt="ndjson"):
+    """
+    Serialise (node_id, version, routing_table) tuples one record at a time.
+
+    ndjson: one JSON object per line
+    msgpack: a stream of concatenated msgpack maps
+    """
+    for node_id, version, routing_table in tables:
+        record = {
+            "node_id": node_id,
+            "version": version,
+            "routing_table": routing_table,
+        }
+        if fmt == "msgpack":
+            yield msgpack.packb(record, use_bin_type=True)
+        else:
+            yield (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a byte stream incrementally into one gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_tables(node_ids=None, fmt="ndjson", compress=False):
+    """
+    Byte stream of routing tables for `node_ids` (None = whole network).
+
+    Raises:
+        ValueError: unknown format, or msgpack requested but not installed
+    """
+    if fmt == "msgpack" and msgpack is None:
+        raise ValueError("msgpack is not installed on this server")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+
+    stream = encode_tables(iter_routing_tables(node_ids), fmt)
+    return gzip_stream(stream) if compress else stream
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
-    calculate_green, add_node, add_edge, update_traffic,
-    get_table, dv_update_test,
+    calculate_green, add_node, add_edge, update_traffic, bulk_update_traffic,
+    get_table, watch_table, bulk_tables, dv_update_test, dv_converge, dv_incremental, routing_status, register_roi, get_roi,
     create_test_network, verify_routing, add_routing_entry_view
 )
 
@@ -10,16 +10,25 @@ urlpatterns = [
     # CLIENT == NODE 
     path("green/<str:node_id>/", calculate_green),
     path("gettable/node/<str:node_id>/", get_table),
+    path("gettable/node/<str:node_id>/watch/", watch_table),
+    path("gettable/bulk/", bulk_tables),
 
     path("add_routing_entry/", add_routing_entry_view),
     
     # CLIENT == ADMIN
     path("node/", add_node),
     path("edge/", add_edge),
+    # before edge/update/<edge_id>/<node_id>/, which would also match "bulk"
+    path("edge/update/bulk/<str:node_id>/", bulk_update_traffic),
     path("edge/update/<str:edge_id>/<str:node_id>/", update_traffic),
+    path("roi/", register_roi),
+    path("roi/<str:camera_id>/", get_roi),
     
-    # AUTOCALL IN FUTURE DV
+    # DV (runs automatically via the routing scheduler)
+    path("routing/status/", routing_status),
     path("routing/dv-update-test/", dv_update_test),
+    path("routing/dv-converge/", dv_converge),
+    path("routing/dv-incremental/", dv_incremental),
     
     # Testing & Debug (keep these - they're useful!)
     path("test/create-network/", create_test_network),
@@ -5,13 +5,21 @@ from rest_framework.response import Response
 from traffic.db.models import Node, Edge
 from traffic.services import add_data
 from traffic.services.green_time import compute_green_times
-from traffic.services.ml_ingest import run_ml_for_edge
-from traffic.services.routing_service import build_routing_table_for_node
-from traffic.services.dv_service import run_dv_update_once
+from traffic.services.ml_ingest import run_ml_for_edges
+from traffic.services.inference_pool import InferenceBusy, InferenceTimeout
+from traffic.services.routing_service import get_routing_table, get_routing_delta
+from traffic.services.routing_versions import get_watch
+from traffic.services.table_export import FORMATS, export_tables
+from traffic.services.dv_service import run_dv_update_once, run_dv_converged
+from traffic.services.routing_scheduler import get_scheduler, get_status as get_routing_status
+from N1T2 import roi_store
 
 from rest_framework import status
+import math
+import threading
 import time
 
+from django.http import StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -23,6 +31,15 @@ from datetime import datetime
 ALPHA = 0.2
 MAX_INFLATION = 1.5
 
+# Long-poll: max seconds a watch request is held, how often this process
+# checks the versions of all watched nodes (one shared query), and how many
+# watch requests may hold a worker thread at once
+ROUTING_LONGPOLL_TIMEOUT_S = 25.0
+ROUTING_LONGPOLL_INTERVAL_S = 1.0
+ROUTING_LONGPOLL_MAX_WATCHERS = 16
+
+_WATCH_SLOTS = threading.BoundedSemaphore(ROUTING_LONGPOLL_MAX_WATCHERS)
+
 
 
 @csrf_exempt
@@ -40,33 +57,45 @@ def calculate_green(request, node_id):
     ml_results = []
     states = []
 
-    for edge_id, image_file in uploaded.items():
+    # Validate every edge before running ML so the batch is all-or-nothing
+    for edge_id in uploaded.keys():
         if edge_id not in outgoing_edges:
             return Response(
                 {"error": f"Edge {edge_id} is not outgoing from node {node_id}"},
                 status=400
             )
 
-        edge = outgoing_edges[edge_id]
+    edge_ids = list(uploaded.keys())
 
-        ml_json = run_ml_for_edge(
-            image_file=image_file,
-            camera_id=edge.camera_id,
+    # One batched forward pass for all cameras of this intersection
+    try:
+        ml_jsons = run_ml_for_edges(
+            uploads=[
+                (uploaded[edge_id], outgoing_edges[edge_id].camera_id)
+                for edge_id in edge_ids
+            ],
             save_vis=True
         )
+    except InferenceBusy as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    except InferenceTimeout as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_504_GATEWAY_TIMEOUT
+        )
 
+    updates_by_edge = {}
+    for edge_id, ml_json in zip(edge_ids, ml_jsons):
         traffic_updates = {
             "total_vehicles": ml_json["vehicle_counts"],
             "queue_length_m": ml_json["queue_length_m"],
             "density": ml_json["density"],
             "pressure": ml_json["pressure"],
         }
-
-        add_data.update_traffic_by_node(
-            node_id=node_id,
-            edge_id=edge_id,
-            updates=traffic_updates
-        )
+        updates_by_edge[edge_id] = traffic_updates
 
         states.append({
             "edge_id": edge_id,
@@ -78,6 +107,9 @@ def calculate_green(request, node_id):
             "ml": ml_json
         })
 
+    # Whole intersection in one round trip
+    add_data.bulk_update_traffic_by_node(node_id, updates_by_edge)
+
     green_times = compute_green_times(states)
 
     return Response({
@@ -168,6 +200,54 @@ def add_edge(request):
     })
 
 
+# CAMERA ROI
+@api_view(["POST"])
+def register_roi(request):
+    """
+    Register or update the road polygon and real-world size of a camera.
+    """
+    data = request.data
+
+    required = ["camera_id", "polygon", "real_length_m", "real_width_m"]
+    missing = [k for k in required if k not in data]
+    if missing:
+        return Response(
+            {"error": f"Missing fields: {missing}"},
+            status=400
+        )
+
+    try:
+        roi = roi_store.register_roi(
+            camera_id=data["camera_id"],
+            polygon=data["polygon"],
+            real_length_m=data["real_length_m"],
+            real_width_m=data["real_width_m"]
+        )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    return Response({
+        "camera_id": data["camera_id"],
+        **roi
+    })
+
+
+@api_view(["GET"])
+def get_roi(request, camera_id):
+    try:
+        roi = roi_store.get_roi(camera_id)
+    except KeyError:
+        return Response(
+            {"error": f"No ROI for camera {camera_id}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    return Response({
+        "camera_id": camera_id,
+        **roi
+    })
+
+
 # TRAFFIC UPDATE
 @api_view(["POST"])
 def update_traffic(request, edge_id, node_id):
@@ -198,6 +278,34 @@ def update_traffic(request, edge_id, node_id):
     })
 
 
+@api_view(["POST"])
+def bulk_update_traffic(request, node_id):
+    """
+    Update traffic for many edges from perspective of node.
+
+    Body: {"updates": {edge_id: {metric: value, ...}, ...}}
+    """
+
+    updates = request.data.get("updates")
+    if not isinstance(updates, dict) or not all(
+        isinstance(u, dict) for u in updates.values()
+    ):
+        return Response(
+            {"error": "`updates` dict of {edge_id: dict} required"},
+            status=400
+        )
+
+    try:
+        result = add_data.bulk_update_traffic_by_node(node_id, updates)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    return Response({
+        "updated_for_node": node_id,
+        **result
+    })
+
+
 # -----------------------------
 # FIND ROUTING TABLE FOR A NODE
 # -----------------------------
@@ -206,6 +314,9 @@ def get_table(request, node_id):
     """
     Called ONLY by traffic nodes.
     Returns routing table for that node.
+
+    Served with an ETag of the table version; polls with a matching
+    If-None-Match get 304 Not Modified.
     """
 
     node = Node.objects(node_id=node_id, is_active=True).first()
@@ -215,13 +326,105 @@ def get_table(request, node_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    routing_table = build_routing_table_for_node(node_id)
+    version, routing_table = get_routing_table(node_id)
+    etag = f'"{node_id}-{version}"'
+
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
     return Response({
         "node_id": node_id,
+        "version": version,
         "routing_table": routing_table,
         "generated_at": int(time.time())
-    })
+    }, headers={"ETag": etag})
+
+
+
+
+@api_view(["GET", "POST"])
+def bulk_tables(request):
+    """
+    Routing tables for many nodes in one streamed response.
+
+    Nodes: GET ?nodes=N1,N2 or POST {"nodes": [...]}; omit for all nodes.
+    Encoding: ?encoding=ndjson (default, one table per line) or msgpack.
+    (Not ?format=, which DRF reserves for its own format suffixes.)
+    Compression: ?compress=gzip
+
+    Inactive nodes are left out; requested nodes without routes get an
+    empty table.
+    """
+    if request.method == "POST":
+        node_ids = request.data.get("nodes")
+    else:
+        nodes_param = request.GET.get("nodes")
+        node_ids = nodes_param.split(",") if nodes_param else None
+
+    if node_ids is not None and not isinstance(node_ids, list):
+        return Response({"error": "`nodes` must be a list"}, status=400)
+
+    fmt = request.GET.get("encoding", "ndjson")
+    compress = request.GET.get("compress") == "gzip"
+
+    try:
+        stream = export_tables(node_ids, fmt=fmt, compress=compress)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    response = StreamingHttpResponse(stream, content_type=FORMATS[fmt])
+    if compress:
+        response["Content-Encoding"] = "gzip"
+    return response
+
+
+@api_view(["GET"])
+def watch_table(request, node_id):
+    """
+    Long-poll for routing table changes.
+
+    GET ?since=<version>[&timeout=<s>] blocks until the node's table moves
+    past `since` and returns only the changed destinations (or the full
+    table if the change history has expired). 304 if nothing changed
+    before the timeout.
+    """
+    try:
+        since = int(request.GET.get("since", 0))
+        timeout = float(request.GET.get("timeout", ROUTING_LONGPOLL_TIMEOUT_S))
+    except ValueError:
+        return Response({"error": "since and timeout must be numbers"}, status=400)
+
+    if not math.isfinite(timeout):
+        return Response({"error": "timeout must be a finite number"}, status=400)
+    timeout = min(max(timeout, 0.0), ROUTING_LONGPOLL_TIMEOUT_S)
+
+    if not Node.objects(node_id=node_id, is_active=True).first():
+        return Response(
+            {"error": "Invalid or inactive node"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    delta = get_routing_delta(node_id, since)
+    if delta is not None:
+        return Response({"node_id": node_id, **delta})
+
+    if not _WATCH_SLOTS.acquire(blocking=False):
+        # Too many held requests; the node retries after a back-off
+        return Response(
+            {"error": "Too many routing watchers"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(int(ROUTING_LONGPOLL_TIMEOUT_S))}
+        )
+    try:
+        changed = get_watch(ROUTING_LONGPOLL_INTERVAL_S).wait(node_id, since, timeout)
+    finally:
+        _WATCH_SLOTS.release()
+
+    if changed:
+        delta = get_routing_delta(node_id, since)
+        if delta is not None:
+            return Response({"node_id": node_id, **delta})
+    return Response(status=status.HTTP_304_NOT_MODIFIED)
 
 
 
@@ -243,6 +446,72 @@ def dv_update_test(request):
     })
 
 
+@api_view(["POST"])
+def dv_converge(request):
+    """
+    Computes converged routes in one shortest-path solve
+    (replaces calling dv_update_test repeatedly).
+    """
+    started = time.time()
+    updates = run_dv_converged()
+
+    return Response({
+        "status": "ok",
+        "updates_applied": updates,
+        "duration_ms": round((time.time() - started) * 1000, 1)
+    })
+
+
+@api_view(["GET"])
+def routing_status(request):
+    """
+    Routing scheduler state (leader, last run start, duration, change
+    count, errors), as recorded by whichever process holds the lease.
+    """
+    return Response(get_routing_status())
+
+
+@api_view(["POST"])
+def dv_incremental(request):
+    """
+    Recomputes only the routes affected by edge cost changes
+    since the previous run, and returns that delta.
+
+    Runs through the routing lease like a scheduler tick: 409 while
+    another process is the routing updater. A worker that is not running
+    the scheduler gives the lease back right after the run.
+    """
+    scheduler = get_scheduler()
+
+    started = time.time()
+    standby = scheduler.stats["standby"]
+    changed = scheduler.run_once()
+    if not scheduler.running:
+        scheduler.step_down()
+
+    if changed is None:
+        if scheduler.stats["standby"] > standby:
+            return Response(
+                {"error": "Routing is being updated by another process",
+                 "leader": get_routing_status()["leader"]},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            {"error": scheduler.stats["last_error"]},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    return Response({
+        "status": "ok",
+        "updates_applied": len(changed),
+        "delta": [
+            {"from": A, "dest": D, "via": B, "cost": cost}
+            for A, D, B, cost in changed
+        ],
+        "duration_ms": round((time.time() - started) * 1000, 1)
+    })
+
+
 
 # @api_view(["POST"])
 # def create_test_network(request):
@@ -6,6 +6,7 @@ STORES IMAGHE IN STUBS->OUTPUT->OUTPUT_IMAGES
 """
 
 from N1T2.test_model import analyze_traffic_image
+from N1T2.artifacts import get_writer
 
  
 test_image = r'C:\Users\ashut\DiMITO\c.jpg'
@@ -20,6 +21,9 @@ result = analyze_traffic_image(
 # Use the result
 print(result)
 
+# Artifacts are written in the background; wait for them before exiting
+get_writer().flush()
+
 
 
 
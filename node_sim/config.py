@@ -13,3 +13,20 @@ EDGE_IMAGES = {
 }
 
 RECOMPUTE_BEFORE = 10
+
+# Routing table long-poll (seconds the backend may hold a watch request,
+# and back-off after a failed one)
+ROUTING_WATCH_TIMEOUT = 25
+ROUTING_RETRY_S = 5
+
+# Car-facing TCP server: newline-delimited JSON, one request per line on
+# persistent connections
+NODE_BACKLOG = 1024             # pending connections queued by the kernel
+NODE_MAX_CONNECTIONS = 4096     # open car connections served at once
+NODE_IDLE_TIMEOUT = 60          # seconds a silent connection is kept open
+NODE_MAX_MESSAGE_BYTES = 64 * 1024
+
+# Green-time requests: HTTP timeout, and the per-edge green used when the
+# backend has never answered (later failures keep the previous schedule)
+GREEN_TIMEOUT = 15
+GREEN_FALLBACK_S = 30
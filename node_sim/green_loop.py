@@ -1,40 +1,132 @@
+import threading
 import time
+from contextlib import ExitStack
+
 import requests
-from config import BASE_URL, RECOMPUTE_BEFORE
+from config import BASE_URL, RECOMPUTE_BEFORE, GREEN_TIMEOUT, GREEN_FALLBACK_S
 
 # sdfgfdsdf
 class GreenManager:
-    def __init__(self, node_id, edge_images):
+    """
+    Runs the signal phases of one node.
+
+    The next cycle's green times are fetched in the background once the
+    last phase of the current cycle has RECOMPUTE_BEFORE seconds left, and
+    swapped in when the cycle ends. If the backend is slow or down, the
+    previous schedule simply runs again, so phase switching never waits
+    on the network. Until the first fetch completes the node runs the
+    fallback schedule, and switches to the fetched one at the next phase
+    boundary rather than waiting for the cycle to end.
+    """
+
+    def __init__(self, node_id, edge_images, base_url=BASE_URL):
         self.node_id = node_id
         self.edge_images = edge_images
+        self.base_url = base_url
+        self.session = requests.Session()
+
         self.green_schedule = []
         self.current_phase = 0
-        self.phase_end = 0
+        self.phase_end = 0          # time.monotonic() deadline of the phase
 
-    def compute_green(self):
-        files = [(eid, open(path, "rb")) for eid, path in self.edge_images.items()]
+        self._next_schedule = None  # filled in by the prefetch thread
+        self._provisional = False   # running the fallback before any fetch
+        self._prefetch = None       # running prefetch thread, if any
+        self._stop = threading.Event()
 
-        r = requests.post(
-            f"{BASE_URL}/green/{self.node_id}/",
-            files=files
-        )
+    # ---------- BACKEND ----------
+    def fetch_green(self):
+        """POST the edge images and return the new schedule (blocking)."""
+        with ExitStack() as stack:
+            files = [
+                (eid, stack.enter_context(open(path, "rb")))
+                for eid, path in self.edge_images.items()
+            ]
+            r = self.session.post(
+                f"{self.base_url}/green/{self.node_id}/",
+                files=files,
+                timeout=GREEN_TIMEOUT
+            )
         r.raise_for_status()
 
         greens = r.json()["green_times"]
-        self.green_schedule = [{"edge": e, "green": t} for e, t in greens.items()]
+        schedule = [{"edge": e, "green": t} for e, t in greens.items()]
+        if not schedule or any(p["green"] <= 0 for p in schedule):
+            raise ValueError(f"Unusable green times: {greens}")
+        return schedule
 
+    def fallback_schedule(self):
+        return [{"edge": e, "green": GREEN_FALLBACK_S} for e in self.edge_images]
+
+    def _prefetch_green(self):
+        try:
+            self._next_schedule = self.fetch_green()
+        except (requests.RequestException, OSError, ValueError, KeyError) as e:
+            print(f"⚠️  Green prefetch failed, keeping previous schedule: {e}")
+
+    def prefetch(self):
+        """Start fetching the next schedule unless a fetch is in flight."""
+        if self._prefetch is not None and self._prefetch.is_alive():
+            return
+        self._prefetch = threading.Thread(target=self._prefetch_green, daemon=True)
+        self._prefetch.start()
+
+    # ---------- PHASES ----------
+    def start_schedule(self, schedule, now=None, provisional=False):
+        now = time.monotonic() if now is None else now
+        self._provisional = provisional
+        self.green_schedule = schedule
         self.current_phase = 0
-        self.phase_end = time.time() + self.green_schedule[0]["green"]
-        print("🚦 Green schedule updated")
+        self.phase_end = now + schedule[0]["green"]
+
+    def in_last_phase(self):
+        return self.current_phase == len(self.green_schedule) - 1
 
     def tick(self):
-        now = time.time()
+        """
+        Advance phases that have ended and start the prefetch when due.
+
+        Returns:
+            seconds until tick() has something to do again
+        """
+        now = time.monotonic()
+
+        # Catch up on every phase that ended since the last tick
+        while self.phase_end <= now:
+            if self.in_last_phase() or (self._provisional and self._next_schedule):
+                schedule, self._next_schedule = self._next_schedule, None
+                self.start_schedule(
+                    schedule or self.green_schedule, self.phase_end,
+                    provisional=self._provisional and not schedule
+                )
+                if schedule:
+                    print("🚦 Green schedule updated")
+            else:
+                self.current_phase += 1
+                self.phase_end += self.green_schedule[self.current_phase]["green"]
+
         remaining = self.phase_end - now
+        if self._provisional and self._next_schedule is None:
+            self.prefetch()
+            return remaining
+
+        if not self.in_last_phase() or self._next_schedule is not None:
+            return remaining
 
         if remaining <= RECOMPUTE_BEFORE:
-            self.compute_green()
+            self.prefetch()
+            return remaining
+
+        return remaining - RECOMPUTE_BEFORE
+
+    def run(self):
+        """Phase loop: sleeps until the next transition or prefetch point."""
+        if not self.green_schedule:
+            self.start_schedule(self.fallback_schedule(), provisional=True)
+            self.prefetch()
+
+        while not self._stop.is_set():
+            self._stop.wait(max(0.0, self.tick()))
 
-        if remaining <= 0:
-            self.current_phase = (self.current_phase + 1) % len(self.green_schedule)
-            dur = self.green_schedule[self.current_phase]["green"]
-            self.phase_end = now + dur
+    def stop(self):
+        self._stop.set()
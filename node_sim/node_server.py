@@ -1,74 +1,188 @@
-import socket
+import asyncio
 import json
 import threading
-import random
 import time
 import requests
 
 from config import *
 from green_loop import GreenManager
+from sampler import compile_choices, compile_table
 # 
 
 class NodeServer:
-    def __init__(self):
+    def __init__(self, node_id=NODE_ID, host=NODE_HOST, port=NODE_PORT,
+                 base_url=BASE_URL, backlog=NODE_BACKLOG,
+                 max_connections=NODE_MAX_CONNECTIONS):
+        self.node_id = node_id
+        self.host = host
+        self.port = port
+        self.base_url = base_url
+        self.backlog = backlog
+        self.max_connections = max_connections
+
         self.routing_table = {}
-        self.green_mgr = GreenManager(NODE_ID, EDGE_IMAGES)
+        self.routing_version = 0
+        self.samplers = {}       # destination -> AliasTable over next hops
+        self.green_mgr = GreenManager(node_id, EDGE_IMAGES, base_url)
+
+        self.connections = 0
+        self.requests_served = 0
 
     # ---------- ROUTING ----------
     def fetch_routing_table(self):
-        r = requests.get(f"{BASE_URL}/gettable/node/{NODE_ID}/")
+        r = requests.get(f"{self.base_url}/gettable/node/{self.node_id}/")
         r.raise_for_status()
-        self.routing_table = r.json()["routing_table"]
+        body = r.json()
+        self.routing_table = body["routing_table"]
+        self.samplers = compile_table(self.routing_table)
+        self.routing_version = body.get("version", 0)
         print("📡 Routing table loaded")
 
+    def apply_routing_delta(self, delta):
+        """
+        Apply a routing delta from the backend in place, recompiling
+        samplers only for the destinations it touches.
+        """
+        if delta["full"]:
+            self.routing_table = dict(delta["updates"])
+            self.samplers = compile_table(self.routing_table)
+        else:
+            for dest, choices in delta["updates"].items():
+                self.routing_table[dest] = choices
+                sampler = compile_choices(choices)
+                if sampler is not None:
+                    self.samplers[dest] = sampler
+                else:
+                    self.samplers.pop(dest, None)
+            for dest in delta["removed"]:
+                self.routing_table.pop(dest, None)
+                self.samplers.pop(dest, None)
+        self.routing_version = delta["version"]
+
+    def watch_routing_table(self):
+        """
+        Long-poll the backend; it answers as soon as this node's
+        routes change, with only the changed destinations.
+        """
+        session = requests.Session()
+        while True:
+            try:
+                r = session.get(
+                    f"{self.base_url}/gettable/node/{self.node_id}/watch/",
+                    params={"since": self.routing_version, "timeout": ROUTING_WATCH_TIMEOUT},
+                    timeout=ROUTING_WATCH_TIMEOUT + 5
+                )
+                if r.status_code == 304:
+                    continue
+                r.raise_for_status()
+
+                delta = r.json()
+                self.apply_routing_delta(delta)
+                print(f"📡 Routing table updated (v{delta['version']}, {len(delta['updates'])} destinations)")
+            except requests.RequestException as e:
+                print(f"⚠️  Routing watch failed: {e}")
+                time.sleep(ROUTING_RETRY_S)
+
     # ---------- CAR REQUEST ----------
-    def handle_car(self, conn, addr):
-        try:
-            data = conn.recv(4096).decode()
-            req = json.loads(data)
+    def handle_request(self, req):
+        """One decoded car request -> response dict."""
+        if req.get("type") == "NEXT_EDGE":
+            sampler = self.samplers.get(req.get("destination"))
+
+            if sampler is None:
+                return {"error": "NO_ROUTE"}
 
-            if req["type"] == "NEXT_EDGE":
-                dest = req["destination"]
-                choices = self.routing_table.get(dest)
+            return {"next_edge": sampler.sample()}
 
-                if not choices:
-                    resp = {"error": "NO_ROUTE"}
+        if req.get("type") == "NEXT_EDGE_BATCH":
+            # {"requests": [{"car_id": C, "destination": D}, ...]}
+            # -> one result per request, in order
+            samplers = self.samplers
+            results = []
+            for item in req.get("requests", []):
+                sampler = samplers.get(item.get("destination"))
+                if sampler is None:
+                    results.append({"car_id": item.get("car_id"), "error": "NO_ROUTE"})
                 else:
-                    edges = [c["edge_id"] for c in choices]
-                    probs = [c["prob"] for c in choices]
-                    edge = random.choices(edges, probs)[0]
-                    resp = {"next_edge": edge}
+                    results.append({"car_id": item.get("car_id"), "next_edge": sampler.sample()})
+            return {"results": results}
+
+        return {"error": "UNKNOWN_TYPE"}
+
+    async def handle_car(self, reader, writer):
+        """
+        Serve one car connection: one JSON request per line, one JSON
+        response per line, until the car disconnects or goes idle.
+        """
+        if self.connections >= self.max_connections:
+            writer.write(b'{"error": "BUSY"}\n')
+            await self._close(writer)
+            return
+
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), NODE_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except ValueError:
+                    # Line longer than NODE_MAX_MESSAGE_BYTES
+                    writer.write(b'{"error": "TOO_LARGE"}\n')
+                    break
+
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    req = json.loads(line)
+                    resp = self.handle_request(req)
+                except (ValueError, AttributeError, TypeError):
+                    resp = {"error": "BAD_REQUEST"}
 
-                conn.send(json.dumps(resp).encode())
+                writer.write(json.dumps(resp).encode() + b"\n")
+                self.requests_served += 1
+                await writer.drain()
+        except ConnectionError:
+            pass
         finally:
-            conn.close()
+            self.connections -= 1
+            await self._close(writer)
+
+    @staticmethod
+    async def _close(writer):
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
 
     # ---------- GREEN LOOP ----------
     def green_loop(self):
-        self.green_mgr.compute_green()
-        while True:
-            self.green_mgr.tick()
-            time.sleep(1)
+        self.green_mgr.run()
 
     # ---------- SERVER ----------
+    async def serve(self):
+        server = await asyncio.start_server(
+            self.handle_car, self.host, self.port,
+            backlog=self.backlog,
+            limit=NODE_MAX_MESSAGE_BYTES
+        )
+
+        print(f"🚦 Node {self.node_id} listening on {self.host}:{self.port}")
+
+        async with server:
+            await server.serve_forever()
+
     def start(self):
         self.fetch_routing_table()
 
+        threading.Thread(target=self.watch_routing_table, daemon=True).start()
         threading.Thread(target=self.green_loop, daemon=True).start()
 
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.bind((NODE_HOST, NODE_PORT))
-        s.listen(10)
-
-        print(f"🚦 Node {NODE_ID} listening on {NODE_HOST}:{NODE_PORT}")
-
-        while True:
-            conn, addr = s.accept()
-            threading.Thread(
-                target=self.handle_car,
-                args=(conn, addr),
-                daemon=True
-            ).start()
+        asyncio.run(self.serve())
 
 
 # if __name__ == "__main__":
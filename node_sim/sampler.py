@@ -0,0 +1,80 @@
+"""
+Next-hop sampler.
+Alias tables (Vose's method) built once per routing-table update, so each
+car request is one random draw and two list lookups.
+"""
+
+import random
+
+
+class AliasTable:
+    def __init__(self, items, weights):
+        n = len(items)
+        if n == 0:
+            raise ValueError("AliasTable needs at least one item")
+
+        total = float(sum(weights))
+        if total > 0:
+            scaled = [w * n / total for w in weights]
+        else:
+            # Probabilities all rounded to 0 -> uniform
+            scaled = [1.0] * n
+
+        self.items = list(items)
+        self.n = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+        # Leftovers are 1.0 up to float error
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rand=random.random):
+        u = rand() * self.n
+        i = int(u)
+        if i >= self.n:
+            i = self.n - 1
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
+
+
+def compile_choices(choices):
+    """
+    Routing table entries of one destination -> AliasTable.
+
+    Args:
+        choices: [{"next_hop": X, "prob": P}, ...]
+
+    Returns:
+        AliasTable over next hops, or None if there are no choices
+    """
+    if not choices:
+        return None
+    return AliasTable(
+        [c["next_hop"] for c in choices],
+        [c["prob"] for c in choices]
+    )
+
+
+def compile_table(routing_table):
+    """{destination: AliasTable} for a whole routing table."""
+    samplers = {}
+    for dest, choices in routing_table.items():
+        sampler = compile_choices(choices)
+        if sampler is not None:
+            samplers[dest] = sampler
+    return samplers